@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Single .env load, before any app module reads its settings from os.environ
+load_dotenv()
@@ -0,0 +1,141 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app import models
+
+# Item analysis over stored game results. Raw answers are aggregated in SQL
+# once per finished game and folded into QuestionStats, so dashboards only
+# read the small materialized table.
+
+DISCRIMINATION_GROUP = 0.27  # classic upper/lower 27% groups
+
+def _correct_sum():
+    return func.sum(case((models.GameAnswer.is_correct == True, 1), else_=0))
+
+def update_question_stats(db: Session, game_id: int):
+    """Folds one finished game into question_stats. Caller commits."""
+    game = db.get(models.GameRecord, game_id)
+    if game is None or game.quiz_id is None:
+        return
+    # Question indexes only mean something within one revision of the quiz
+    revision = game.quiz_revision or 0
+
+    # Upper/lower groups by final score
+    ranked = [row[0] for row in db.query(models.GamePlayerResult.nickname)
+              .filter(models.GamePlayerResult.game_id == game_id)
+              .order_by(models.GamePlayerResult.score.desc()).all()]
+    group_size = max(1, round(len(ranked) * DISCRIMINATION_GROUP)) if len(ranked) >= 2 else 0
+    upper = ranked[:group_size]
+    lower = ranked[-group_size:] if group_size else []
+
+    base = db.query(models.GameAnswer.question_index).filter(models.GameAnswer.game_id == game_id)
+
+    totals = base.with_entities(
+        models.GameAnswer.question_index,
+        func.count(models.GameAnswer.id),
+        _correct_sum(),
+        func.sum(models.GameAnswer.response_time),
+        func.count(models.GameAnswer.response_time)
+    ).group_by(models.GameAnswer.question_index).all()
+
+    option_rows = base.with_entities(
+        models.GameAnswer.question_index, models.GameAnswer.option_index, func.count(models.GameAnswer.id)
+    ).filter(models.GameAnswer.option_index != None).group_by(
+        models.GameAnswer.question_index, models.GameAnswer.option_index
+    ).all()
+
+    def correct_by_question(nicknames):
+        if not nicknames:
+            return {}
+        return dict(base.with_entities(models.GameAnswer.question_index, _correct_sum())
+                    .filter(models.GameAnswer.nickname.in_(nicknames))
+                    .group_by(models.GameAnswer.question_index).all())
+
+    upper_correct = correct_by_question(upper)
+    lower_correct = correct_by_question(lower)
+
+    options = {}
+    for q_idx, opt_idx, count in option_rows:
+        options.setdefault(q_idx, {})[str(opt_idx)] = count
+
+    existing = {s.question_index: s for s in db.query(models.QuestionStats)
+                .filter(models.QuestionStats.quiz_id == game.quiz_id,
+                        models.QuestionStats.quiz_revision == revision).all()}
+
+    for q_idx, attempts, correct, rt_sum, rt_count in totals:
+        stats = existing.get(q_idx)
+        if stats is None:
+            stats = models.QuestionStats(quiz_id=game.quiz_id, quiz_revision=revision, question_index=q_idx, games=0, attempts=0,
+                                         correct=0, response_time_sum=0.0, response_time_count=0,
+                                         option_counts={}, upper_n=0, upper_correct=0, lower_n=0, lower_correct=0)
+            db.add(stats)
+        stats.games += 1
+        stats.attempts += attempts
+        stats.correct += int(correct or 0)
+        stats.response_time_sum += float(rt_sum or 0)
+        stats.response_time_count += rt_count
+        merged = dict(stats.option_counts or {})
+        for opt, count in options.get(q_idx, {}).items():
+            merged[opt] = merged.get(opt, 0) + count
+        stats.option_counts = merged
+        stats.upper_n += len(upper)
+        stats.upper_correct += int(upper_correct.get(q_idx) or 0)
+        stats.lower_n += len(lower)
+        stats.lower_correct += int(lower_correct.get(q_idx) or 0)
+
+def clear_question_stats(db: Session, quiz_id: int, before_revision: int = None):
+    """Drops stats of a deleted quiz, or of its revisions older than before_revision. Caller commits."""
+    query = db.query(models.QuestionStats).filter(models.QuestionStats.quiz_id == quiz_id)
+    if before_revision is not None:
+        query = query.filter(models.QuestionStats.quiz_revision < before_revision)
+    query.delete(synchronize_session=False)
+
+def question_report(stats: models.QuestionStats) -> dict:
+    """Derived item statistics for one question."""
+    attempts = stats.attempts or 0
+    counts = stats.option_counts or {}
+    discrimination = None
+    if stats.upper_n and stats.lower_n:
+        discrimination = round(stats.upper_correct / stats.upper_n - stats.lower_correct / stats.lower_n, 3)
+    return {
+        "question_index": stats.question_index,
+        "games": stats.games,
+        "attempts": attempts,
+        "difficulty": round(stats.correct / attempts, 3) if attempts else None, # p-value: share answering correctly
+        "discrimination": discrimination,
+        "avg_response_time": round(stats.response_time_sum / stats.response_time_count, 2) if stats.response_time_count else None,
+        "option_rates": {opt: round(count / attempts, 3) for opt, count in sorted(counts.items())} if attempts else {},
+    }
+
+def student_trend(db: Session, user_id: int, nickname: str) -> list:
+    """A nickname's sessions across the teacher's quizzes, oldest first.
+
+    Results outlive their quiz: a deleted quiz's sessions stay in the trend
+    under the title recorded when the game was played.
+    """
+    accuracy = db.query(
+        models.GameAnswer.game_id.label("game_id"),
+        func.count(models.GameAnswer.id).label("answers"),
+        _correct_sum().label("correct")
+    ).filter(models.GameAnswer.nickname == nickname).group_by(models.GameAnswer.game_id).subquery()
+
+    rows = db.query(
+        models.GameRecord.id, models.GameRecord.quiz_id,
+        func.coalesce(models.Quiz.title, models.GameRecord.quiz_title), models.GameRecord.started_at,
+        models.GamePlayerResult.score, models.GamePlayerResult.rank, accuracy.c.answers, accuracy.c.correct
+    ).join(models.GamePlayerResult, models.GamePlayerResult.game_id == models.GameRecord.id
+    ).outerjoin(models.Quiz, models.Quiz.id == models.GameRecord.quiz_id
+    ).outerjoin(accuracy, accuracy.c.game_id == models.GameRecord.id
+    ).filter(func.coalesce(models.GameRecord.user_id, models.Quiz.user_id) == user_id,
+             models.GamePlayerResult.nickname == nickname
+    ).order_by(models.GameRecord.started_at).all()
+
+    return [{
+        "game_id": game_id,
+        "quiz_id": quiz_id,
+        "quiz_title": quiz_title,
+        "played_at": started_at.isoformat() if started_at else None,
+        "score": score,
+        "rank": rank,
+        "answers": answers or 0,
+        "accuracy": round((correct or 0) / answers, 3) if answers else None,
+    } for game_id, quiz_id, quiz_title, started_at, score, rank, answers, correct in rows]
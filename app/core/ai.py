@@ -0,0 +1,430 @@
+from collections import deque
+from typing import Optional
+import asyncio
+import json
+import os
+import time
+
+API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Try models in order of preference: Flash (Fast/Cheap), then Pro (Stable)
+MODELS = ['gemini-2.0-flash', 'gemini-2.5-flash', 'gemini-pro-latest']
+
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "60"))  # seconds per model call
+AI_MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", "3"))  # simultaneous LLM calls per process
+
+# Per-model circuit breaker: after enough recent failures a model is skipped
+# for a cooldown instead of costing every request its full failure latency
+AI_BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "10"))  # recent calls considered
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "3"))
+AI_BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "60"))  # seconds before a probe call
+AI_MODELS_REFRESH = float(os.getenv("AI_MODELS_REFRESH", "600"))  # seconds between list_models() refreshes
+
+class AIError(Exception):
+    pass
+
+class CircuitBreaker:
+    """closed -> open (failure rate over the window too high) -> half_open (one probe after cooldown)."""
+    def __init__(self, window: int = AI_BREAKER_WINDOW, min_calls: int = AI_BREAKER_MIN_CALLS,
+                 failure_rate: float = AI_BREAKER_FAILURE_RATE, cooldown: float = AI_BREAKER_COOLDOWN):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.results = deque(maxlen=window)  # True = success
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record(self, success: bool):
+        if self.state == "half_open":
+            self.probing = False
+            if success:
+                self.state = "closed"
+                self.results.clear()
+            else:
+                self._open()
+            return
+        self.results.append(success)
+        if len(self.results) >= self.min_calls and self.current_failure_rate() >= self.failure_rate:
+            self._open()
+
+    def abandon(self):
+        """The call was cancelled by our side: neither success nor failure."""
+        self.probing = False
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def current_failure_rate(self) -> float:
+        if not self.results:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": round(self.current_failure_rate(), 3),
+            "calls": len(self.results),
+            "trips": self.trips,
+        }
+
+class GeminiBackend:
+    """Talks to Google Gemini through the SDK's async API (never blocks the event loop)."""
+    def __init__(self, api_key: str = API_KEY):
+        self.api_key = api_key
+        self._configured = False
+
+    def _genai(self):
+        import google.generativeai as genai
+        if not self._configured:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+        return genai
+
+    async def generate(self, model_name: str, prompt: str) -> str:
+        model = self._genai().GenerativeModel(model_name)
+        response = await model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, model_name: str, prompt: str):
+        model = self._genai().GenerativeModel(model_name)
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    async def list_models(self) -> list:
+        # The SDK only offers a blocking iterator here
+        return await asyncio.to_thread(lambda: [m.name for m in self._genai().list_models()])
+
+class AIGateway:
+    """Bounded, timed access to the LLM backend with queueing metrics.
+
+    The backend is swappable (e.g. a local stub in tests): anything with
+    async generate(model_name, prompt) -> str, an async generator
+    stream(model_name, prompt) yielding text chunks and async list_models() -> list.
+    """
+    def __init__(self, backend=None, max_concurrent: int = AI_MAX_CONCURRENT, timeout: float = AI_TIMEOUT):
+        self.backend = backend or GeminiBackend()
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self._semaphore = None
+        # Metrics
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.total_latency = 0.0
+        # Model health
+        self.breakers = {}
+        self.available_models: Optional[set] = None  # from list_models(), refreshed in the background
+        self.models_refreshed_at = None
+        self._refresh_task = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(getattr(self.backend, "api_key", True))
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        if model_name not in self.breakers:
+            self.breakers[model_name] = CircuitBreaker()
+        return self.breakers[model_name]
+
+    # --- Model availability cache ---
+    def start(self, interval: float = AI_MODELS_REFRESH):
+        if self._refresh_task is None and self.configured:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await self.refresh_models()
+            await asyncio.sleep(interval)
+
+    async def refresh_models(self):
+        try:
+            names = await asyncio.wait_for(self.backend.list_models(), 10)
+            # The API reports "models/<name>"
+            self.available_models = {name.split("/", 1)[-1] for name in names}
+            self.models_refreshed_at = time.time()
+        except Exception as e:
+            print(f"AI model list refresh failed: {e}")
+
+    def candidates(self, models: list = None) -> list:
+        """Preferred models that the API currently lists."""
+        models = models or MODELS
+        if self.available_models:
+            listed = [m for m in models if m in self.available_models]
+            models = listed or models  # a stale or unexpected list must not disable everything
+        return models
+
+    async def _acquire(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        semaphore = self._semaphore
+
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.total_wait += time.perf_counter() - queued_at
+        self.running += 1
+        return semaphore
+
+    def _release(self, semaphore: asyncio.Semaphore, started: float):
+        self.total_latency += time.perf_counter() - started
+        self.running -= 1
+        semaphore.release()
+
+    async def generate(self, model_name: str, prompt: str, timeout: float = None) -> str:
+        timeout = timeout or self.timeout
+        breaker = self.breaker(model_name)
+        try:
+            semaphore = await self._acquire()
+        except asyncio.CancelledError:
+            breaker.abandon()  # a half-open probe cancelled in the queue must not stay reserved
+            raise
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(self.backend.generate(model_name, prompt), timeout)
+            self.completed += 1
+            breaker.record(True)
+            return text
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            breaker.record(False)
+            raise AIError(f"{model_name}: zaman aşımı ({timeout:.0f} sn)")
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception:
+            self.failed += 1
+            breaker.record(False)
+            raise
+        finally:
+            self._release(semaphore, started)
+
+    async def stream(self, model_name: str, prompt: str, timeout: float = None):
+        """Yields text chunks as the model produces them; the timeout bounds the whole reply."""
+        timeout = timeout or self.timeout
+        breaker = self.breaker(model_name)
+        try:
+            semaphore = await self._acquire()
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.abandon()
+            raise
+        started = time.perf_counter()
+        deadline = started + timeout
+        chunks = self.backend.stream(model_name, prompt).__aiter__()
+        try:
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+            self.completed += 1
+            breaker.record(True)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            breaker.record(False)
+            raise AIError(f"{model_name}: zaman aşımı ({timeout:.0f} sn)")
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.abandon()
+            raise
+        except Exception:
+            self.failed += 1
+            breaker.record(False)
+            raise
+        finally:
+            self._release(semaphore, started)
+
+    async def generate_with_fallback(self, prompt: str, models: list = None) -> str:
+        """Tries each healthy model in order; raises AIError with diagnostics if all fail."""
+        last_error = None
+        for model_name in self.candidates(models):
+            if not self.breaker(model_name).allow():
+                continue
+            try:
+                return await self.generate(model_name, prompt)
+            except Exception as e:
+                print(f"Model {model_name} failed: {e}")
+                last_error = e
+        raise self._all_failed(last_error)
+
+    async def stream_with_fallback(self, prompt: str, models: list = None):
+        """Streaming variant: falls back to the next model only until the first chunk was sent."""
+        last_error = None
+        for model_name in self.candidates(models):
+            if not self.breaker(model_name).allow():
+                continue
+            started = False
+            try:
+                async for chunk in self.stream(model_name, prompt):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                print(f"Model {model_name} failed: {e}")
+                last_error = e
+        raise self._all_failed(last_error)
+
+    def _all_failed(self, last_error: Optional[Exception]) -> AIError:
+        if last_error is None:
+            # Every breaker is open: fail fast instead of waiting on dead models
+            return AIError("Yapay zeka modelleri geçici olarak kullanılamıyor, lütfen biraz sonra tekrar deneyin.")
+
+        # Debugging: report the cached model list (never calls the API on the request path)
+        if self.available_models is not None:
+            debug_msg = f"Erişilebilir modeller: {', '.join(sorted(self.available_models))}"
+        else:
+            debug_msg = "Model listesi henüz alınamadı."
+
+        print(f"All models failed. {debug_msg}")
+        return AIError(f"{str(last_error)}. {debug_msg}")
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed + self.timed_out
+        return {
+            "max_concurrent": self.max_concurrent,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "avg_wait": round(self.total_wait / finished, 3) if finished else 0.0,
+            "avg_latency": round(self.total_latency / finished, 3) if finished else 0.0,
+            "models": {name: breaker.stats() for name, breaker in self.breakers.items()},
+            "available_models": sorted(self.available_models) if self.available_models is not None else None,
+            "models_refreshed_at": self.models_refreshed_at,
+        }
+
+def parse_model_json(text: str) -> dict:
+    """Parses a JSON reply, stripping markdown code fences if the model ignored instructions."""
+    text_resp = text.strip()
+    if text_resp.startswith("```"):
+        text_resp = text_resp.replace("```json", "").replace("```", "")
+    return json.loads(text_resp)
+
+class QuestionStreamParser:
+    """Incrementally pulls complete objects out of the "questions" array of a streamed JSON reply.
+
+    feed() takes raw text chunks (markdown fences and all) and returns the
+    question dicts whose closing brace has arrived so far.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.start = None
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text: str) -> list:
+        found = []
+        if self.finished:
+            return found
+        self.buffer += text
+        while self.pos < len(self.buffer):
+            if not self.in_array:
+                idx = self.buffer.find('"questions"', self.pos)
+                bracket = self.buffer.find("[", idx) if idx != -1 else -1
+                if bracket == -1:
+                    break
+                self.in_array = True
+                self.pos = bracket + 1
+                continue
+
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.start = self.pos
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        found.append(json.loads(self.buffer[self.start:self.pos + 1]))
+                    except ValueError:
+                        pass # malformed item: skip it, keep streaming the rest
+                    self.start = None
+            elif ch == "]" and self.depth == 0:
+                self.finished = True
+                break
+            self.pos += 1
+
+        # Drop consumed text so the buffer only holds the object in progress
+        if self.in_array:
+            cut = self.start if self.start is not None else self.pos
+            self.buffer = self.buffer[cut:]
+            self.pos -= cut
+            if self.start is not None:
+                self.start = 0
+        return found
+
+def validate_question(q, question_type: str = "multiple_choice", time_limit: int = 20, points: int = 1000):
+    """Returns the question in editor shape, or None if it is unusable."""
+    if not isinstance(q, dict) or not str(q.get("text") or "").strip():
+        return None
+    options = q.get("options")
+    if not isinstance(options, list) or not options:
+        return None
+    options = [{"text": str(o.get("text", "")), "is_correct": bool(o.get("is_correct"))}
+               for o in options if isinstance(o, dict)]
+    if not any(o["is_correct"] for o in options):
+        return None
+    return {
+        "text": str(q["text"]).strip(),
+        "time_limit": q.get("limit", q.get("time_limit", time_limit)),
+        "points": q.get("points", points),
+        "question_type": question_type,
+        "image_url": "",
+        "options": options,
+    }
+
+ai_gateway = AIGateway()
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from app.database import SessionLocal
+from app.core.ai import MODELS
+from app import models
+import hashlib
+import json
+import os
+import threading
+
+# Persistent, content-addressed cache of parsed AI replies. Teachers often
+# regenerate the same topic/count/difficulty combination; identical requests
+# are answered from the DB instead of paying full LLM latency and cost again.
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1000"))  # max stored replies
+PROMPT_VERSION = 1  # bump when prompts change so old replies stop matching
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+def cache_key(kind: str, topics: list, difficulty: str, question_type: str = "multiple_choice",
+              time_limit: int = 20, points: int = 1000) -> str:
+    """sha256 over the normalized request plus the model preference list."""
+    normalized = {
+        "kind": kind,
+        "prompt_version": PROMPT_VERSION,
+        "models": MODELS,
+        "topics": [_normalize_text(t) for t in topics],
+        "difficulty": _normalize_text(difficulty),
+        "type": _normalize_text(question_type),
+        "time_limit": int(time_limit),
+        "points": int(points),
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class AIResponseCache:
+    """DB-backed TTL cache with least-recently-used eviction. Methods block: call from the threadpool."""
+    def __init__(self, ttl: int = AI_CACHE_TTL, maxsize: int = AI_CACHE_SIZE, enabled: bool = AI_CACHE_ENABLED):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._lock = threading.Lock()  # metrics only
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.fresh = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _count(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        db = SessionLocal()
+        try:
+            entry = db.query(models.AIResponse).filter(models.AIResponse.key == key).first()
+            if entry is None:
+                self._count("misses")
+                return None
+            now = datetime.utcnow()
+            if entry.created_at < now - timedelta(seconds=self.ttl):
+                db.delete(entry)
+                db.commit()
+                self._count("expired")
+                self._count("misses")
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = now
+            response = entry.response
+            db.commit()
+            self._count("hits")
+            return response
+        finally:
+            db.close()
+
+    def record_fresh(self):
+        """A caller explicitly bypassed the cache ("fresh" regeneration)."""
+        self._count("fresh")
+
+    def put(self, key: str, kind: str, response: dict):
+        if not self.enabled:
+            return
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            entry = db.query(models.AIResponse).filter(models.AIResponse.key == key).first()
+            if entry is None:
+                entry = models.AIResponse(key=key, kind=kind, hits=0)
+                db.add(entry)
+            entry.response = response
+            entry.created_at = now
+            entry.last_used_at = now
+            db.flush()
+            self._evict(db, now)
+            db.commit()
+            self._count("stores")
+        except Exception as e:
+            # Another request may have stored the same key concurrently; the cache is best-effort
+            db.rollback()
+            print(f"AI Cache Error: {e}")
+        finally:
+            db.close()
+
+    def _evict(self, db, now: datetime):
+        removed = db.query(models.AIResponse).filter(
+            models.AIResponse.created_at < now - timedelta(seconds=self.ttl)
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(models.AIResponse).count() - self.maxsize
+        if overflow > 0:
+            oldest = [row[0] for row in db.query(models.AIResponse.id)
+                      .order_by(models.AIResponse.last_used_at).limit(overflow).all()]
+            removed += db.query(models.AIResponse).filter(
+                models.AIResponse.id.in_(oldest)
+            ).delete(synchronize_session=False)
+        if removed:
+            self._count("evictions", removed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "ttl": self.ttl,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "fresh": self.fresh,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+ai_cache = AIResponseCache()
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, Request
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app import models
+import os
+import threading
+import time
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+class CachedUser:
+    """Read-only snapshot of a User row, safe to share between requests/sessions."""
+    def __init__(self, user: models.User):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.is_approved = user.is_approved
+        self.reset_requested = user.reset_requested
+        self.first_name = user.first_name
+        self.last_name = user.last_name
+        self.email = user.email
+        self.phone = user.phone
+
+class UserCache:
+    """Small TTL + LRU cache of users keyed by username (the user_session cookie)."""
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # username -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, db: Session, username: str) -> Optional[CachedUser]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        user = db.query(models.User).filter(models.User.username == username).first()
+        if not user:
+            return None
+
+        cached = CachedUser(user)
+        with self._lock:
+            self._entries[username] = (now + self.ttl, cached)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return cached
+
+    def invalidate(self, *usernames: str):
+        with self._lock:
+            for username in usernames:
+                if username:
+                    self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+user_cache = UserCache()
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> Optional[CachedUser]:
+    """Resolves the user_session cookie to a (cached) user, or None if not logged in."""
+    username = request.cookies.get("user_session")
+    if not username:
+        return None
+    return user_cache.get(db, username)
@@ -0,0 +1,215 @@
+from starlette.datastructures import Headers, MutableHeaders
+import os
+import threading
+import time
+import zlib
+
+# Response compression (pure ASGI).
+#
+# gzip always, brotli when the 'brotli' package is installed, picked from the
+# request's Accept-Encoding. Only text-like content types above a size
+# threshold are compressed. WebSocket traffic is never touched, and responses
+# that already carry a Content-Encoding (precompressed /static files, the
+# page cache) pass through as-is. Server-Sent Events are excluded too: they
+# must reach the browser event by event.
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSIBLE_TYPES = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/javascript",
+    "application/json", "application/javascript", "image/svg+xml",
+)
+# Paths whose response size and time-to-first-byte are reported under /metrics
+MEASURED_PATHS = [p.strip() for p in os.getenv("MEASURED_PATHS", "/host,/play,/api/quizzes/").split(",") if p.strip()]
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def parse_qvalue(params: list) -> float:
+    for param in params:
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return max(0.0, min(1.0, float(value)))
+            except ValueError:
+                return 0.0
+    return 1.0
+
+def pick_encoding(accept_encoding: str, available=None):
+    """Best supported coding by q-value (br wins ties); q=0 rules a coding out, '*' covers unlisted ones.
+
+    `available` restricts the choice (e.g. to the precompressed files that exist);
+    by default it is what this process can encode on the fly.
+    """
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if token:
+            qvalues[token] = parse_qvalue(params)
+    wildcard = qvalues.get("*", 0.0)
+    best, best_q = None, 0.0
+    if available is None:
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in ("br", "gzip"):
+        if encoding not in available:
+            continue
+        q = qvalues.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class StreamCompressor:
+    """Incremental gzip/brotli encoder; every chunk is flushed so streams stay live."""
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class ResponseStats:
+    """Bytes and time-to-first-byte for MEASURED_PATHS."""
+    def __init__(self, paths: list):
+        self._lock = threading.Lock()
+        self._stats = {path: {"requests": 0, "raw_bytes": 0, "sent_bytes": 0, "ttfb": 0.0, "ttfb_max": 0.0} for path in paths}
+        self.compressed = 0
+        self.skipped = 0
+
+    def measured(self, path: str) -> bool:
+        return path in self._stats
+
+    def record(self, path: str, raw_bytes: int, sent_bytes: int, ttfb: float):
+        with self._lock:
+            entry = self._stats[path]
+            entry["requests"] += 1
+            entry["raw_bytes"] += raw_bytes
+            entry["sent_bytes"] += sent_bytes
+            entry["ttfb"] += ttfb
+            entry["ttfb_max"] = max(entry["ttfb_max"], ttfb)
+
+    def record_outcome(self, compressed: bool):
+        with self._lock:
+            if compressed:
+                self.compressed += 1
+            else:
+                self.skipped += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            paths = {}
+            for path, e in self._stats.items():
+                n = e["requests"]
+                paths[path] = {
+                    "requests": n,
+                    "avg_raw_bytes": e["raw_bytes"] // n if n else 0,
+                    "avg_sent_bytes": e["sent_bytes"] // n if n else 0,
+                    "avg_ttfb_ms": round(e["ttfb"] / n * 1000, 2) if n else 0.0,
+                    "max_ttfb_ms": round(e["ttfb_max"] * 1000, 2),
+                }
+            return {
+                "enabled": COMPRESSION_ENABLED,
+                "brotli": brotli is not None,
+                "compressed": self.compressed,
+                "skipped": self.skipped,
+                "paths": paths,
+            }
+
+response_stats = ResponseStats(MEASURED_PATHS)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # WebSockets and lifespan go straight through
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        measured = response_stats.measured(path)
+        encoding = pick_encoding(Headers(scope=scope).get("accept-encoding", "")) if COMPRESSION_ENABLED else None
+        if encoding is None and not measured:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {"start": None, "compressor": None, "passthrough": encoding is None,
+                 "raw": 0, "sent": 0, "ttfb": None}
+
+        async def send_body(message):
+            if state["ttfb"] is None:
+                state["ttfb"] = time.perf_counter() - started
+            state["sent"] += len(message.get("body", b""))
+            await send(message)
+
+        async def wrapped_send(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if (headers.get("content-encoding") or content_type not in COMPRESSIBLE_TYPES
+                        or message["status"] in (204, 304)):
+                    state["passthrough"] = True
+                if state["passthrough"]:
+                    if encoding is not None:
+                        response_stats.record_outcome(False)
+                    await send(message)
+                else:
+                    # Headers wait until we know whether the body is worth compressing
+                    state["start"] = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            state["raw"] += len(body)
+
+            if state["passthrough"]:
+                await send_body(message)
+            elif state["compressor"] is None:
+                start = state["start"]
+                if not more_body and len(body) < self.minimum_size:
+                    response_stats.record_outcome(False)
+                    await send(start)
+                    await send_body(message)
+                else:
+                    response_stats.record_outcome(True)
+                    state["compressor"] = StreamCompressor(encoding)
+                    compressed = state["compressor"].compress(body, final=not more_body)
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        # The encoded bytes differ from the identity body the strong ETag names
+                        headers["ETag"] = "W/" + etag
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    await send_body({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            else:
+                compressed = state["compressor"].compress(body, final=not more_body)
+                await send_body({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+            if measured and not more_body:
+                response_stats.record(path, state["raw"], state["sent"], state["ttfb"] or 0.0)
+
+        await self.app(scope, receive, wrapped_send)
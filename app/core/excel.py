@@ -0,0 +1,274 @@
+from io import BytesIO
+
+# Pure openpyxl helpers. Kept free of FastAPI/DB imports so they can run in
+# the worker process pool (app/core/workers.py): arguments and results must be
+# picklable and the module cheap to import in a fresh process. openpyxl itself
+# is imported inside the functions, on the first import/export.
+
+TEMPLATE_HEADERS = [
+    "Soru Metni",
+    "Süre (sn)",
+    "Puan (1000/2000/0)",
+    "A Seçeneği",
+    "B Seçeneği",
+    "C Seçeneği",
+    "D Seçeneği",
+    "Doğru Cevap (A/B/C/D)"
+]
+
+# Localized template variants. Column order is identical, only labels differ,
+# so every variant can be imported back (see HEADER_ALIASES).
+TEMPLATE_VARIANTS = {
+    "tr": {
+        "sheet_title": "Soru Şablonu",
+        "filename": "quiz_sablon.xlsx",
+        "headers": TEMPLATE_HEADERS,
+        "sample_data": [
+            ["Türkiye'nin başkenti neresidir?", 20, 1000, "İstanbul", "Ankara", "İzmir", "Bursa", "B"],
+            ["Python dili hangi yıl çıkmıştır?", 30, 2000, "1989", "1991", "2000", "1995", "B"],
+            ["Su kaç derecede kaynar?", 15, 1000, "100", "90", "80", "50", "A"]
+        ]
+    },
+    "en": {
+        "sheet_title": "Question Template",
+        "filename": "quiz_template.xlsx",
+        "headers": [
+            "Question Text",
+            "Time (s)",
+            "Points (1000/2000/0)",
+            "Option A",
+            "Option B",
+            "Option C",
+            "Option D",
+            "Correct Answer (A/B/C/D)"
+        ],
+        "sample_data": [
+            ["What is the capital of Turkey?", 20, 1000, "Istanbul", "Ankara", "Izmir", "Bursa", "B"],
+            ["In which year was Python first released?", 30, 2000, "1989", "1991", "2000", "1995", "B"],
+            ["At what temperature does water boil (°C)?", 15, 1000, "100", "90", "80", "50", "A"]
+        ]
+    }
+}
+DEFAULT_TEMPLATE_LANG = "tr"
+
+# Accepted first-column headers when reading a sheet back
+HEADER_ALIASES = {variant["headers"][0] for variant in TEMPLATE_VARIANTS.values()}
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class ExcelFormatError(Exception):
+    """Invalid sheet content; carries the HTTP status and user-facing message."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def build_template(lang: str = DEFAULT_TEMPLATE_LANG) -> bytes:
+    """Generates the sample Excel template for quiz import."""
+    import openpyxl
+    variant = TEMPLATE_VARIANTS[lang]
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = variant["sheet_title"]
+
+    # Write Headers
+    for col_num, header in enumerate(variant["headers"], 1):
+        cell = ws.cell(row=1, column=col_num, value=header)
+        cell.font = openpyxl.styles.Font(bold=True)
+        # Adjust column width
+        ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = 20
+
+    # Write Sample Data
+    for row_idx, row_data in enumerate(variant["sample_data"], 2):
+        for col_idx, value in enumerate(row_data, 1):
+            ws.cell(row=row_idx, column=col_idx, value=value)
+
+    # Save to buffer
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+# Optional column for bulk imports: rows are grouped into quizzes by this value
+GROUP_HEADER = "Yarışma"
+GROUP_HEADER_ALIASES = {GROUP_HEADER, "Quiz"}
+
+# Optional columns after the fixed ones, found by header name (exports write
+# them so non-multiple-choice and image questions survive a round trip)
+QUESTION_TYPE_HEADER = "Soru Tipi"
+IMAGE_HEADER = "Görsel URL"
+EXTRA_HEADER_ALIASES = {
+    "question_type": {QUESTION_TYPE_HEADER, "Question Type"},
+    "image_url": {IMAGE_HEADER, "Image URL"},
+}
+QUESTION_TYPES = {"multiple_choice", "true_false", "typing", "poll", "marked_answer"}
+
+def parse_row(row, strict: bool, extras: dict = None) -> dict:
+    """Converts one template row (plus optional extra column values) into a question dict."""
+    extras = extras or {}
+    # Read-only sheets can return short rows when trailing cells are empty
+    row = tuple(row) + (None,) * (len(TEMPLATE_HEADERS) - len(row))
+
+    question_type = str(extras.get("question_type") or "multiple_choice").strip().lower()
+    if question_type not in QUESTION_TYPES:
+        if strict:
+            raise ExcelFormatError(400, f"Satır {row[0]}: Geçersiz soru tipi '{question_type}'.")
+        question_type = "multiple_choice"
+    image_url = str(extras.get("image_url") or "").strip() or None
+
+    # Expected: q_text, time, points, optA, optB, optC, optD, correct_letter
+    q_text = str(row[0] or "").strip()
+    time_limit = int(row[1]) if row[1] not in (None, "") else 20
+    points = int(row[2]) if row[2] not in (None, "") else 1000  # 0 is valid (no points)
+
+    # Options
+    opt_a = str(row[3] or "").strip()
+    opt_b = str(row[4] or "").strip()
+    opt_c = str(row[5] or "").strip()
+    opt_d = str(row[6] or "").strip()
+
+    correct_char = str(row[7] or "").strip().upper()
+
+    # Map correct char to index
+    mapping = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+    correct_idx = mapping.get(correct_char, -1) # -1 if invalid
+
+    if strict and correct_idx == -1 and (opt_a or opt_b) and question_type != "poll":
+         raise ExcelFormatError(400, f"Satır {row[0]}: Geçersiz doğru cevap şıkkı '{correct_char}'. Lütfen sadece A, B, C veya D giriniz.")
+    # For preview/parse we stay lenient: -1 simply marks no option, frontend warns
+
+    options = [
+        {"text": opt_a, "is_correct": correct_idx == 0},
+        {"text": opt_b, "is_correct": correct_idx == 1},
+        {"text": opt_c, "is_correct": correct_idx == 2},
+        {"text": opt_d, "is_correct": correct_idx == 3},
+    ]
+    if question_type != "multiple_choice":
+        # True/false, typing, poll and marked answers only use their filled-in options
+        options = [opt for opt in options if opt["text"]]
+
+    return {
+        "text": q_text,
+        "time_limit": time_limit,
+        "points": points,
+        "question_type": question_type,
+        "image_url": image_url,
+        "options": options
+    }
+
+def extra_columns(header_row) -> dict:
+    """Index of each optional column (extras + GROUP_HEADER) present after the fixed ones."""
+    columns = {}
+    for idx in range(len(TEMPLATE_HEADERS), len(header_row)):
+        name = str(header_row[idx] or "").strip()
+        if name in GROUP_HEADER_ALIASES:
+            columns["group"] = idx
+        for key, aliases in EXTRA_HEADER_ALIASES.items():
+            if name in aliases:
+                columns[key] = idx
+    return columns
+
+def row_extras(row, columns: dict) -> dict:
+    return {key: row[idx] for key, idx in columns.items() if key != "group" and idx < len(row)}
+
+def iter_questions(path: str, strict: bool, max_rows: int):
+    """Streams question dicts out of the active sheet (openpyxl read-only mode)."""
+    import openpyxl
+    wb = openpyxl.load_workbook(filename=path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(values_only=True)
+
+        # Validate headers (basic check: at least first column)
+        header_row = next(rows, None)
+        if not header_row or header_row[0] not in HEADER_ALIASES:
+            raise ExcelFormatError(400, "Geçersiz şablon formatı. Lütfen sağlanan şablonu kullanın.")
+        columns = extra_columns(header_row)
+
+        count = 0
+        for row_num, row in enumerate(rows, 2):
+            if not row or not row[0]: # Skip empty question text
+                continue
+            count += 1
+            if count > max_rows:
+                raise ExcelFormatError(400, f"En fazla {max_rows} soru yüklenebilir.")
+            try:
+                yield parse_row(row[:len(TEMPLATE_HEADERS)], strict, row_extras(row, columns))
+            except (ValueError, TypeError) as e:
+                # e.g. text in the time/points column
+                raise ExcelFormatError(400, f"Satır {row_num}: Geçersiz değer: {e}")
+    finally:
+        wb.close()
+
+def parse_questions_file(path: str, strict: bool, max_rows: int) -> list:
+    """Process-pool entry point: parses the whole sheet into a list."""
+    return list(iter_questions(path, strict, max_rows))
+
+def parse_workbook(path: str, max_rows: int) -> dict:
+    """Bulk import: validates every row of every sheet without raising.
+
+    Each sheet becomes one quiz named after the sheet, unless it has a
+    GROUP_HEADER column, in which case rows are grouped by that value.
+    Returns {"quizzes": [{"title", "questions", "errors"}], "errors": [...], "rows": n}.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(filename=path, read_only=True, data_only=True)
+    quizzes = {}  # title -> {"title", "questions", "errors"} (insertion ordered)
+    errors = []
+    total_rows = 0
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header_row = next(rows, None)
+            if not header_row or header_row[0] not in HEADER_ALIASES:
+                errors.append({"sheet": ws.title, "row": 1, "error": "Geçersiz şablon formatı, sayfa atlandı."})
+                continue
+            columns = extra_columns(header_row)
+            group_col = columns.get("group")
+
+            for row_num, row in enumerate(rows, 2):
+                if not row or not row[0]: # Skip empty question text
+                    continue
+                total_rows += 1
+                if total_rows > max_rows:
+                    raise ExcelFormatError(400, f"En fazla {max_rows} soru yüklenebilir.")
+
+                title = ws.title
+                if group_col is not None and len(row) > group_col and row[group_col]:
+                    title = str(row[group_col]).strip()
+                quiz = quizzes.setdefault(title, {"title": title, "questions": [], "errors": []})
+
+                try:
+                    quiz["questions"].append(parse_row(row[:len(TEMPLATE_HEADERS)], True, row_extras(row, columns)))
+                except ExcelFormatError as e:
+                    quiz["errors"].append({"sheet": ws.title, "row": row_num, "error": e.detail})
+                except (ValueError, TypeError) as e:
+                    quiz["errors"].append({"sheet": ws.title, "row": row_num, "error": f"Geçersiz değer: {e}"})
+    finally:
+        wb.close()
+
+    for quiz in quizzes.values():
+        errors.extend(quiz["errors"])
+    return {"quizzes": list(quizzes.values()), "errors": errors, "rows": total_rows}
+
+LETTERS = "ABCD"
+
+# Export layout: fixed columns + the optional type/image columns
+EXPORT_HEADERS = TEMPLATE_HEADERS + [QUESTION_TYPE_HEADER, IMAGE_HEADER]
+
+def question_to_row(text, time_limit, points, options, question_type=None, image_url=None) -> list:
+    """Inverse of parse_row: one question (options as (text, is_correct) pairs) -> EXPORT_HEADERS row."""
+    options = list(options)[:len(LETTERS)]
+    texts = [opt_text or "" for opt_text, _ in options]
+    texts += [""] * (len(LETTERS) - len(texts))
+    correct = next((LETTERS[i] for i, (_, is_correct) in enumerate(options) if is_correct), "")
+    return [text, time_limit, points] + texts + [correct, question_type or "multiple_choice", image_url or ""]
+
+def write_xlsx(path: str, rows, headers: list, sheet_title: str = "Sorular"):
+    """Writes rows with openpyxl write-only mode (rows are flushed to disk as they come)."""
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_title)
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+
+# Downscaled WebP variants of uploaded question images. Like app/core/excel.py
+# this module stays free of FastAPI/DB imports: build_variants() runs in the
+# worker process pool. Pillow is optional; without it images are served as-is.
+
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+IMAGE_VARIANTS_ENABLED = os.getenv("IMAGE_VARIANTS_ENABLED", "true").lower() in ("1", "true", "yes") and PILLOW_AVAILABLE
+
+# Max width per recipient: phones get a small image, the projector a large one
+IMAGE_VARIANT_WIDTHS = {
+    "player": int(os.getenv("IMAGE_PLAYER_WIDTH", "640")),
+    "host": int(os.getenv("IMAGE_HOST_WIDTH", "1600")),
+}
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+
+def variant_name(filename: str, width: int) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}-w{width}.webp"
+
+def build_variants(upload_dir: str, filename: str, widths: list, quality: int = IMAGE_VARIANT_QUALITY) -> list:
+    """Process-pool entry point: writes one WebP per width next to the original. Returns the new names."""
+    from PIL import Image, ImageOps
+
+    written = []
+    with Image.open(os.path.join(upload_dir, filename)) as img:
+        if getattr(img, "is_animated", False):
+            return written # Keep GIF animations untouched
+
+        img = ImageOps.exif_transpose(img) # Phone photos are often stored rotated
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+        for width in widths:
+            name = variant_name(filename, width)
+            target = os.path.join(upload_dir, name)
+            if os.path.exists(target):
+                continue
+            variant = img.copy()
+            variant.thumbnail((width, width * 4)) # Bounds the width, never upscales
+            variant.save(target + ".part", "WEBP", quality=quality, method=4)
+            os.replace(target + ".part", target)
+            written.append(name)
+    return written
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.responses import Response
+from app.core.compression import pick_encoding
+from app.core.quiz_cache import etag_matches
+from app.core.templates import templates
+import gzip
+import hashlib
+import os
+import threading
+
+# Full-page cache for anonymous pages (/, /login, /register, /forgot-password, /play).
+#
+# These pages render the same HTML for every visitor, so they are rendered
+# once and kept as raw + gzip (+ brotli when the package is installed) bytes.
+# Templates see cached_page=True and must not put per-request values (like
+# the CSRF token) into the HTML; those are filled in client-side instead.
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "32"))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class CachedPage:
+    """One rendered page with its precompressed variants."""
+    def __init__(self, body: bytes):
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etag = f'"p-{digest}"'
+
+    def encoding_for(self, accept_encoding: str) -> str:
+        encoding = pick_encoding(accept_encoding)
+        return encoding if encoding in self.bodies else "identity"
+
+class PageCache:
+    """LRU cache of rendered anonymous pages keyed by (template, context)."""
+    def __init__(self, maxsize: int = PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._pages: "OrderedDict[tuple, CachedPage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _lookup(self, key: tuple):
+        with self._lock:
+            page = self._pages.get(key)
+            if page:
+                self._pages.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return page
+
+    def _store(self, key: tuple, page: CachedPage):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+
+    def render(self, request: Request, name: str, context: dict = None) -> Response:
+        """TemplateResponse replacement for pages without per-user content."""
+        context = context or {}
+        if not PAGE_CACHE_ENABLED:
+            return templates.TemplateResponse(name, {"request": request, "cached_page": False, **context})
+
+        key = (name, tuple(sorted(context.items())))
+        page = self._lookup(key)
+        if page is None:
+            rendered = templates.TemplateResponse(name, {"request": request, "cached_page": True, **context})
+            page = CachedPage(rendered.body)
+            self._store(key, page)
+
+        encoding = page.encoding_for(request.headers.get("accept-encoding", ""))
+        # Encoded bodies get a weak ETag: the strong one names the identity bytes
+        etag = page.etag if encoding == "identity" else "W/" + page.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(page.etag, request.headers.get("if-none-match")):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=page.bodies[encoding], media_type="text/html", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": PAGE_CACHE_ENABLED,
+                "size": len(self._pages),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+page_cache = PageCache()
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from typing import Optional
+from jinja2.utils import htmlsafe_json_dumps
+from app import models
+from app.quiz_store import quiz_questions
+import json
+import os
+import threading
+
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "256"))
+
+def quiz_api_dict(quiz: models.Quiz) -> dict:
+    """Same shape as schemas.Quiz (used by GET /api/quizzes/{id})."""
+    return {
+        "title": quiz.title,
+        "description": quiz.description,
+        "theme": quiz.theme,
+        "settings": quiz.settings,
+        "id": quiz.id,
+        "revision": quiz.revision,
+        "questions": [
+            {
+                "text": q["text"],
+                "time_limit": q["time_limit"],
+                "points": q["points"],
+                "question_type": q["question_type"],
+                "image_url": q["image_url"],
+                "id": q["id"],
+                "quiz_id": quiz.id,
+                "options": [
+                    {"text": o["text"], "is_correct": o["is_correct"], "id": o["id"], "question_id": q["id"]}
+                    for o in q["options"]
+                ]
+            }
+            for q in quiz_questions(quiz)
+        ]
+    }
+
+def quiz_editor_dict(quiz: models.Quiz) -> dict:
+    """Shape expected by create_quiz.html (window.serverQuizData)."""
+    return {
+        "id": quiz.id,
+        "revision": quiz.revision,
+        "title": quiz.title,
+        "description": quiz.description,
+        "theme": quiz.theme,
+        "settings": quiz.settings or {},
+        "questions": [
+            {
+                "text": q["text"],
+                "time_limit": q["time_limit"],
+                "points": q["points"],
+                "question_type": q["question_type"],
+                "image_url": q["image_url"],
+                "options": [{"text": opt["text"], "is_correct": opt["is_correct"]} for opt in q["options"]]
+            }
+            for q in quiz_questions(quiz)
+        ]
+    }
+
+def quiz_etag(quiz_id: int, revision: int) -> str:
+    return f'"q{quiz_id}-r{revision}"'
+
+def current_revision(db, quiz_id: int) -> Optional[int]:
+    """Revision of a quiz straight from the DB (one column, one row); None if it doesn't exist."""
+    row = db.query(models.Quiz.document_version).filter(models.Quiz.id == quiz_id).first()
+    if row is None:
+        return None
+    return row[0] or 0
+
+class QuizDocument:
+    """Pre-rendered representations of one quiz revision."""
+    def __init__(self, quiz: models.Quiz):
+        self.quiz_id = quiz.id
+        self.user_id = quiz.user_id
+        self.title = quiz.title
+        self.revision = quiz.revision
+        self.api_json = json.dumps(quiz_api_dict(quiz), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # Already HTML-escaped, can be embedded in a <script> as-is
+        self.editor_json = htmlsafe_json_dumps(quiz_editor_dict(quiz))
+        self.etag = quiz_etag(self.quiz_id, self.revision)
+
+class QuizDocumentCache:
+    """LRU cache of serialized quizzes, validated against Quiz.document_version.
+
+    The revision lives in the DB and is bumped by every write (sync_document),
+    so a write made by another worker or a migration script is seen on the
+    next lookup instead of serving a stale copy until eviction.
+    """
+    def __init__(self, maxsize: int = QUIZ_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._docs: "OrderedDict[int, QuizDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _lookup(self, quiz_id: int, revision: int) -> Optional[QuizDocument]:
+        with self._lock:
+            doc = self._docs.get(quiz_id)
+            if doc and doc.revision == revision:
+                self._docs.move_to_end(quiz_id)
+                self.hits += 1
+                return doc
+            self.misses += 1
+            return None
+
+    def get(self, db, quiz_id: int, revision: Optional[int] = None) -> Optional[QuizDocument]:
+        """Cached document for the quiz's current revision, else load + serialize from the DB."""
+        if revision is None:
+            revision = current_revision(db, quiz_id)
+            if revision is None:
+                return None
+        doc = self._lookup(quiz_id, revision)
+        if doc:
+            return doc
+
+        quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+        if quiz is None:
+            return None
+        doc = QuizDocument(quiz)
+
+        with self._lock:
+            current = self._docs.get(quiz_id)
+            # Never replace a newer revision with an older one
+            if current is None or current.revision <= doc.revision:
+                self._docs[quiz_id] = doc
+                self._docs.move_to_end(quiz_id)
+                while len(self._docs) > self.maxsize:
+                    self._docs.popitem(last=False)
+        return doc
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self, *quiz_ids: int):
+        """Frees memory early; correctness doesn't depend on it (revisions are checked on every read)."""
+        with self._lock:
+            for quiz_id in quiz_ids:
+                self._docs.pop(quiz_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._docs),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+quiz_cache = QuizDocumentCache()
@@ -0,0 +1,126 @@
+from fastapi.staticfiles import StaticFiles
+from functools import lru_cache
+from markupsafe import Markup
+from app.core.compression import pick_encoding
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+import json
+import mimetypes
+import os
+import re
+import sys
+
+# Static asset serving for /static.
+#
+# build_assets.py (run before packaging) writes fingerprinted copies
+# (name.<hash>.ext), .gz/.br siblings and a manifest.json into app/static.
+# Templates reference assets through static_url()/vendor_tags(), so they pick
+# up the fingerprinted names when a build exists and the plain ones otherwise.
+
+# cdn: third-party libraries from their CDNs (default when running from source)
+# local: vendored copies from app/static/vendor (LAN-only classrooms; default for the PyInstaller build)
+ASSET_MODE = os.getenv("ASSET_MODE", "local" if getattr(sys, "frozen", False) else "cdn").lower()
+
+MANIFEST_NAME = "manifest.json"
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{12}\.[a-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+# name -> (CDN tag, vendored candidates in order of preference). Tailwind is compiled to CSS when the
+# standalone CLI was available at build time, else its runtime is vendored.
+VENDOR_ASSETS = {
+    "tailwind": ('<script src="https://cdn.tailwindcss.com"></script>', ["vendor/tailwind.css", "vendor/tailwindcss.js"]),
+    "alpine": ('<script defer src="https://cdn.jsdelivr.net/npm/alpinejs@3.13.3/dist/cdn.min.js"></script>', ["vendor/alpine.min.js"]),
+    "confetti": ('<script src="https://cdn.jsdelivr.net/npm/canvas-confetti@1.9.2/dist/confetti.browser.min.js"></script>', ["vendor/confetti.browser.min.js"]),
+    "qrcode": ('<script src="https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js"></script>', ["vendor/qrcode.min.js"]),
+}
+
+_manifest = None
+
+def static_dir() -> str:
+    from app.core.templates import resource_path
+    return resource_path("app/static")
+
+def load_manifest() -> dict:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(static_dir(), MANIFEST_NAME), encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+# Fragment cache: asset tags/URLs only depend on ASSET_MODE and the manifest,
+# both fixed for the life of the process, so every page reuses the same strings.
+@lru_cache(maxsize=None)
+def static_url(path: str) -> str:
+    """/static URL of an asset, fingerprinted when build_assets.py has run."""
+    return "/static/" + load_manifest().get(path, path)
+
+def _local_file(candidates: list):
+    manifest = load_manifest()
+    for path in candidates:
+        if path in manifest or os.path.exists(os.path.join(static_dir(), path)):
+            return path
+    return None
+
+@lru_cache(maxsize=None)
+def vendor_tags(*names) -> Markup:
+    """Script/link tags for third-party libraries according to ASSET_MODE."""
+    tags = []
+    for name in names:
+        cdn_tag, candidates = VENDOR_ASSETS[name]
+        local = _local_file(candidates) if ASSET_MODE == "local" else None
+        if local is None:
+            tags.append(cdn_tag)
+        elif local.endswith(".css"):
+            # Pages still assign tailwind.config inline; give them an object to write to
+            tags.append('<script>window.tailwind = window.tailwind || {};</script>')
+            tags.append(f'<link rel="stylesheet" href="{static_url(local)}">')
+        else:
+            defer = " defer" if name == "alpine" else ""
+            tags.append(f'<script{defer} src="{static_url(local)}"></script>')
+    return Markup("\n    ".join(tags))
+
+def fresh_sibling(path: str, original_stat):
+    """stat of a precompressed sibling, or None if it's missing or older than the
+    original (a file edited after build_assets.py ran is served uncompressed)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat if stat.st_mtime >= original_stat.st_mtime else None
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with precompressed (.br/.gz) variants and far-future caching for fingerprinted names."""
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+
+        siblings = {}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            compressed_stat = fresh_sibling(full_path + suffix, stat_result)
+            if compressed_stat is not None:
+                siblings[encoding] = (full_path + suffix, compressed_stat)
+        # Same q-value negotiation as dynamic responses ("br;q=0" rules br out), limited to the files we have
+        encoding = pick_encoding(request_headers.get("accept-encoding", ""), siblings) if siblings else None
+
+        if encoding is not None:
+            compressed, compressed_stat = siblings[encoding]
+            response = FileResponse(
+                compressed,
+                status_code=status_code,
+                stat_result=compressed_stat,
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                response = NotModifiedResponse(response.headers)
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            if siblings:
+                response.headers["Vary"] = "Accept-Encoding"
+
+        # Fingerprinted names never change content; plain names revalidate (ETag/Last-Modified)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE if FINGERPRINTED.search(full_path) else "no-cache"
+        return response
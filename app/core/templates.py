@@ -1,8 +1,13 @@
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
+from jinja2 import FileSystemBytecodeCache
 from app.core.csrf import get_csrf_token
+from app.core.static import static_url, vendor_tags
 import os
 import sys
+import tempfile
+import threading
+import time
 
 # Helper for PyInstaller path
 def resource_path(relative_path):
@@ -15,11 +20,60 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+# Compiled template bytecode survives restarts, so cold starts skip parsing.
+# The system temp dir is writable both for the exe and on Vercel.
+TEMPLATE_BYTECODE_DIR = os.getenv("TEMPLATE_BYTECODE_DIR", os.path.join(tempfile.gettempdir(), "bisual-jinja"))
+# The frozen exe can't change its templates: skip the mtime check on every render
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false" if getattr(sys, "frozen", False) else "true").lower() in ("1", "true", "yes")
+
+class RenderStats:
+    """Per-template render counts and timings (exposed under /metrics)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._stats.setdefault(name, {"renders": 0, "total": 0.0, "max": 0.0})
+            entry["renders"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "renders": e["renders"],
+                    "avg_ms": round(e["total"] / e["renders"] * 1000, 2),
+                    "max_ms": round(e["max"] * 1000, 2),
+                }
+                for name, e in sorted(self._stats.items())
+            }
+
+render_stats = RenderStats()
+
+class TimedTemplates(Jinja2Templates):
+    def TemplateResponse(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().TemplateResponse(*args, **kwargs)
+        render_stats.record(response.template.name, time.perf_counter() - started)
+        return response
+
 # Initialize Templates
-templates = Jinja2Templates(directory=resource_path("app/templates"))
+templates = TimedTemplates(directory=resource_path("app/templates"))
+templates.env.auto_reload = TEMPLATE_AUTO_RELOAD
+try:
+    os.makedirs(TEMPLATE_BYTECODE_DIR, exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_BYTECODE_DIR)
+except OSError as e:
+    print(f"Template bytecode cache disabled: {e}")
 
 # Inject CSRF token function into templates
 def csrf_token_func(request: Request):
     return get_csrf_token(request)
 
 templates.env.globals['csrf_token'] = csrf_token_func
+
+# Asset URLs (fingerprinted / vendored when build_assets.py has run)
+templates.env.globals['static_url'] = static_url
+templates.env.globals['vendor_tags'] = vendor_tags
@@ -0,0 +1,151 @@
+from fastapi.staticfiles import StaticFiles
+from app.core.images import IMAGE_VARIANTS_ENABLED, IMAGE_VARIANT_WIDTHS, build_variants, variant_name
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+
+# Uploaded question images. Files are stored under the sha256 of their
+# content, so the same picture uploaded twice is kept once and every URL
+# is immutable (safe to cache forever on phones and the projector).
+
+# Writable path: next to the EXE, or /tmp for Vercel
+if os.environ.get("VERCEL"):
+    UPLOAD_DIR = "/tmp/uploads"
+else:
+    UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+HASH_NAME_LENGTH = 32  # hex chars of the sha256 kept in the filename
+
+# The stored extension comes from the file's magic bytes, never from the client
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+CONTENT_NAME = re.compile(r"^[0-9a-f]{%d}(-w\d+)?\.[a-z0-9]+$" % HASH_NAME_LENGTH)
+# Uploads from before content addressing were stored as <uuid4>.<ext>
+LEGACY_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(-w\d+)?\.[a-z0-9]+$")
+VARIANT_SUFFIX = re.compile(r"-w\d+\.")
+
+def is_original_image(filename: str) -> bool:
+    """An uploaded image (content-addressed or legacy) that variants can be built from."""
+    return bool(CONTENT_NAME.match(filename) or LEGACY_NAME.match(filename)) and not VARIANT_SUFFIX.search(filename)
+
+class UploadError(Exception):
+    """Rejected upload; carries the HTTP status and user-facing message."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def sniff_image_type(head: bytes):
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def store_image(fileobj, max_bytes: int = MAX_IMAGE_BYTES) -> str:
+    """
+    Copies an image stream into UPLOAD_DIR in chunks, hashing while copying.
+    Returns the content-addressed filename. Blocking: call from the threadpool.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    ext = None
+    tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".part", delete=False)
+    try:
+        with tmp:
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if ext is None:
+                    ext = sniff_image_type(chunk)
+                    if ext is None:
+                        raise UploadError(400, "Sadece PNG, JPEG, GIF veya WEBP resim yüklenebilir.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(413, f"Resim en fazla {max_bytes // (1024 * 1024)} MB olabilir.")
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        if ext is None:
+            raise UploadError(400, "Boş dosya yüklenemez.")
+
+        filename = f"{hasher.hexdigest()[:HASH_NAME_LENGTH]}.{ext}"
+        path = os.path.join(UPLOAD_DIR, filename)
+        if os.path.exists(path):
+            os.remove(tmp.name)  # Duplicate: keep the stored copy
+        else:
+            os.replace(tmp.name, path)
+        return filename
+    except BaseException:
+        if os.path.exists(tmp.name):
+            os.remove(tmp.name)
+        raise
+
+# --- Responsive variants (see app/core/images.py) ---
+_variant_tasks = set()
+_variant_pending = set()  # filenames currently being processed
+_known_variants = set()
+_no_variants = set()  # e.g. animated GIFs: always served as uploaded
+
+def schedule_variants(filename: str):
+    """Builds the WebP variants in the job pool without delaying the caller."""
+    if not IMAGE_VARIANTS_ENABLED or filename in _variant_pending or filename in _no_variants:
+        return
+    _variant_pending.add(filename)
+    task = asyncio.create_task(_build_variants(filename))
+    _variant_tasks.add(task)
+    task.add_done_callback(_variant_tasks.discard)
+
+async def _build_variants(filename: str):
+    from app.core.workers import job_pool
+    try:
+        await job_pool.run(build_variants, UPLOAD_DIR, filename, sorted(set(IMAGE_VARIANT_WIDTHS.values())))
+        names = [variant_name(filename, w) for w in IMAGE_VARIANT_WIDTHS.values()]
+        existing = [name for name in names if os.path.exists(os.path.join(UPLOAD_DIR, name))]
+        _known_variants.update(existing)
+        if not existing:
+            _no_variants.add(filename)
+    except Exception as e:
+        _no_variants.add(filename)  # don't retry a broken image on every broadcast
+        print(f"Image Variant Error ({filename}): {e}")
+    finally:
+        _variant_pending.discard(filename)
+
+def media_url(url: str, role: str) -> str:
+    """URL of the variant sized for `role` ("host"/"player") once it exists, else the original."""
+    if not IMAGE_VARIANTS_ENABLED or not url or not url.startswith("/uploads/"):
+        return url
+    filename = url[len("/uploads/"):]
+    if not is_original_image(filename):
+        return url # Not an upload we know, or already a variant
+    name = variant_name(filename, IMAGE_VARIANT_WIDTHS[role])
+    if name not in _known_variants:
+        if not os.path.exists(os.path.join(UPLOAD_DIR, name)):
+            # Uploaded before variants existed (or still processing): serve the original this time
+            if os.path.exists(os.path.join(UPLOAD_DIR, filename)):
+                schedule_variants(filename)
+            return url
+        _known_variants.add(name)
+    return f"/uploads/{name}"
+
+class UploadFiles(StaticFiles):
+    """/uploads with long-lived caching for content-addressed files (legacy UUID names revalidate)."""
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if CONTENT_NAME.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+        return response
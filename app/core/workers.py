@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import os
+
+# Executor for CPU-bound jobs (Excel parsing/generation, exports) so they never
+# compete with live game sockets for the event loop / GIL.
+# JOB_POOL_MODE=process (default) or thread (serverless hosts without fork/spawn).
+JOB_POOL_MODE = os.getenv("JOB_POOL_MODE", "thread" if os.environ.get("VERCEL") else "process")
+JOB_POOL_WORKERS = int(os.getenv("JOB_POOL_WORKERS", "2"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "60"))  # seconds
+
+class JobPool:
+    def __init__(self, mode: str = JOB_POOL_MODE, workers: int = JOB_POOL_WORKERS, timeout: float = JOB_TIMEOUT):
+        self.mode = mode
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._semaphore = None
+        self._inflight = {}   # executor -> running jobs
+        self._retired = set()  # executors replaced after a stuck job, terminated once idle
+        # Metrics
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.recycled = 0
+
+    def _new_executor(self):
+        if self.mode == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._executor = self._new_executor()
+        # One slot per worker: jobs wait here, never inside the executor, so the
+        # timeout only covers actual run time
+        self._semaphore = asyncio.Semaphore(self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+        for executor in list(self._retired):
+            self._terminate(executor)
+        self._retired.clear()
+
+    def _terminate(self, executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self.mode == "process":
+            # A stuck worker process would otherwise run forever; threads can't be killed
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+
+    def _recycle(self, executor):
+        """Replaces the pool after a job overran its timeout, so its slot is usable again."""
+        if executor is self._executor:
+            self._executor = self._new_executor()
+            self.recycled += 1
+        self._retired.add(executor)
+
+    def _finished(self, executor):
+        self._inflight[executor] -= 1
+        if self._inflight[executor] == 0:
+            del self._inflight[executor]
+            # Other jobs of a retired pool are allowed to finish first
+            if executor in self._retired:
+                self._retired.discard(executor)
+                self._terminate(executor)
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Runs fn(*args) in the pool. Raises asyncio.TimeoutError after `timeout` seconds.
+
+        fn and its arguments/result must be picklable in process mode (module-level functions).
+        """
+        self.start()
+        semaphore = self._semaphore
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        executor = self._executor
+        self._inflight[executor] = self._inflight.get(executor, 0) + 1
+        try:
+            job = executor.submit(fn, *args)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(job), timeout or self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                if not job.cancel():
+                    # Already running: retire the pool instead of leaving a slot occupied
+                    self._recycle(executor)
+                raise
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._finished(executor)
+            self.running -= 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "recycled": self.recycled,
+        }
+
+job_pool = JobPool()
@@ -1,7 +1,12 @@
 import random
 import string
+import time
+import uuid
+from datetime import datetime
 from typing import Dict, List, Optional
 from fastapi import WebSocket
+from app.core.uploads import media_url
+from app.results_writer import results_writer
 
 class Player:
     def __init__(self, nickname: str, websocket: WebSocket):
@@ -23,6 +28,13 @@ class GameSession:
         self.state = "LOBBY" # LOBBY, QUESTION, LEADERBOARD, END
         self.current_question_index = 0
         self.current_shuffled_options = [] # Store options order for current question
+        # Results capture (flushed to results_writer after each question / at game end)
+        self.uid = uuid.uuid4().hex
+        self.pin = None
+        self.started = False
+        self.results_closed = False
+        self.question_started_at = None
+        self.pending_answers = []
 
     async def broadcast(self, message: dict):
         import asyncio
@@ -93,6 +105,7 @@ class GameManager:
             self.quiz_pins[quiz_id] = pin
         
         session = GameSession(quiz_data, host_ws)
+        session.pin = pin
         self.active_games[pin] = session
         return pin
 
@@ -156,7 +169,7 @@ class GameManager:
                     "text": q['text'] if show_on_phone else "",
                     "time": q['time'], # Ideally remaining time, but full time is fine for sync
                     "q_type": q['type'],
-                    "image": q.get('image') if show_on_phone else None,
+                    "image": media_url(q.get('image'), "player") if show_on_phone else None,
                     "options": [o['text'] for o in options] if show_on_phone else [],
                     "options_count": len(options)
                 })
@@ -164,7 +177,13 @@ class GameManager:
                  # Send leaderboard wait screen
                  # We don't send individual result since they didn't play, but maybe just leaderboard data?
                  # Or just wait state. Frontend defaults to WAITING so it's fine.
-                 pass
+                 prefetch = self.prefetch_message(session, session.current_question_index + 1, "player")
+                 if prefetch:
+                     await self._safe_send(player_ws, prefetch)
+            elif session.state == "LOBBY":
+                prefetch = self.prefetch_message(session, 0, "player")
+                if prefetch:
+                    await self._safe_send(player_ws, prefetch)
 
             return True
         return False
@@ -173,6 +192,7 @@ class GameManager:
         if pin in self.active_games:
             session = self.active_games[pin]
             session.state = "END"
+            self.record_game_end(session, finished=True)
             await session.broadcast({"type": "GAME_OVER", "leaderboard": self.get_leaderboard(session)})
             # We don't remove game immediately so they can see results. Host can leave manually.
 
@@ -181,11 +201,15 @@ class GameManager:
             session = self.active_games[pin]
             session.state = "QUESTION"
             session.current_question_index = 0
+            if not session.started:
+                session.started = True
+                results_writer.game_started(session.uid, session.quiz, pin)
             await self.broadcast_question(session)
 
     async def next_question(self, pin: str):
         if pin in self.active_games:
             session = self.active_games[pin]
+            self.flush_results(session)
             session.current_question_index += 1
             if session.current_question_index < len(session.quiz['questions']):
                 session.state = "QUESTION"
@@ -198,6 +222,7 @@ class GameManager:
                 await self.broadcast_question(session)
             else:
                 session.state = "END"
+                self.record_game_end(session, finished=True)
                 await session.broadcast({"type": "GAME_OVER", "leaderboard": self.get_leaderboard(session)})
 
     async def broadcast_question(self, session: GameSession):
@@ -210,11 +235,13 @@ class GameManager:
             random.shuffle(options)
         
         session.current_shuffled_options = options
+        session.question_started_at = time.monotonic()
         
         # Prepare Host Payload (Use shuffled options)
         # We need to construct a question object with shuffled options for the host
         q_for_host = q.copy()
         q_for_host['options'] = options
+        q_for_host['image'] = media_url(q.get('image'), "host")
 
         await session.host_websocket.send_json({
             "type": "NEW_QUESTION",
@@ -231,11 +258,32 @@ class GameManager:
             "text": q['text'] if show_on_phone else "", # Hide text if setting OFF, but options always ON now?
             "time": q['time'],
             "q_type": q['type'],
-            "image": q.get('image') if show_on_phone else None,
+            "image": media_url(q.get('image'), "player") if show_on_phone else None,
             "options": [o['text'] for o in options], # Always send options text
             "options_count": len(options)
         })
 
+    def prefetch_message(self, session: GameSession, index: int, role: str) -> Optional[dict]:
+        """PREFETCH hint with the media of question `index` for `role` ("host"/"player").
+
+        Only URLs are sent (content-addressed, so they reveal nothing about the
+        question); clients warm their cache before NEW_QUESTION starts the timer.
+        """
+        questions = session.quiz.get('questions', [])
+        if index >= len(questions) or not questions[index].get('image'):
+            return None
+        if role == "player" and not session.quiz.get('settings', {}).get('show_question_on_player', False):
+            return None # Phones won't display the image
+        return {"type": "PREFETCH", "index": index, "urls": [media_url(questions[index]['image'], role)]}
+
+    async def send_prefetch(self, session: GameSession, index: int):
+        host_msg = self.prefetch_message(session, index, "host")
+        if host_msg:
+            await self._safe_send(session.host_websocket, host_msg)
+        player_msg = self.prefetch_message(session, index, "player")
+        if player_msg:
+            await self.broadcast_to_players(session, player_msg)
+
     async def broadcast_to_players(self, session: GameSession, message: dict):
         # Optimized broadcasting using asyncio.gather for parallel execution
         import asyncio
@@ -258,6 +306,8 @@ class GameManager:
             session = self.active_games[pin]
             player = session.players.get(nickname)
             if not player: return
+            # One answer per question: resends would be scored and recorded again
+            if player.has_answered: return
             
             # Record that player answered
             player.has_answered = True
@@ -324,6 +374,31 @@ class GameManager:
             elif current_q['type'] == 'typing':
                  correct_answer_text = current_q['options'][0]['text']
 
+            # Original (unshuffled) option index, used for distractor analysis
+            option_index = None
+            if q_type not in ('typing', 'marked_answer'):
+                options = session.current_shuffled_options if session.current_shuffled_options else q['options']
+                try:
+                    ans_idx = int(answer)
+                    # Same bounds as scoring: a negative index must not count as the last option
+                    if 0 <= ans_idx < len(options):
+                        chosen = options[ans_idx]
+                        option_index = next(i for i, o in enumerate(q['options']) if o is chosen)
+                except (ValueError, TypeError, StopIteration):
+                    option_index = None
+
+            # Capture for results persistence (in-memory only, written behind)
+            session.pending_answers.append({
+                "question_index": session.current_question_index,
+                "nickname": nickname,
+                "answer": str(answer)[:200],
+                "option_index": option_index,
+                "is_correct": is_correct,
+                "points": points if is_correct else 0,
+                "response_time": round(time.monotonic() - session.question_started_at, 3) if session.question_started_at else None,
+                "answered_at": datetime.utcnow()
+            })
+
             # Update Player State
             if is_correct:
                 player.streak += 1
@@ -376,6 +451,7 @@ class GameManager:
         if pin in self.active_games:
             session = self.active_games[pin]
             session.state = "LEADERBOARD"
+            self.flush_results(session)
             data = self.get_leaderboard(session)
             await session.broadcast({"type": "LEADERBOARD", "data": data})
 
@@ -393,9 +469,30 @@ class GameManager:
                     })
                 except: pass
 
+            # Next question's media downloads while everyone looks at the leaderboard
+            await self.send_prefetch(session, session.current_question_index + 1)
+
+    def flush_results(self, session: GameSession):
+        """Hands buffered answers to the write-behind queue (non-blocking)."""
+        if session.started and session.pending_answers:
+            results_writer.answers(session.uid, session.pending_answers)
+            session.pending_answers = []
+
+    def record_game_end(self, session: GameSession, finished: bool):
+        if not session.started or session.results_closed:
+            return
+        session.results_closed = True
+        self.flush_results(session)
+        players = sorted(session.players.values(), key=lambda p: p.score, reverse=True)
+        results_writer.game_ended(session.uid, [
+            {"nickname": p.nickname, "avatar": p.avatar, "score": p.score} for p in players
+        ], finished=finished)
+
     def remove_game(self, pin: str):
 
         if pin in self.active_games:
+            # Host left: keep whatever was played so far
+            self.record_game_end(self.active_games[pin], finished=False)
             del self.active_games[pin]
 
 game_manager = GameManager()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, Float, DateTime
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -10,11 +10,17 @@ class Quiz(Base):
     description = Column(String, nullable=True)
     theme = Column(String, default="standard")
     settings = Column(JSON, default={})  # New: Store flexible settings
+    document = Column(JSON, nullable=True)  # Denormalized questions/options (see quiz_store.py)
+    document_version = Column(Integer, default=0)  # Quiz revision, bumped on every write
     user_id = Column(Integer, ForeignKey("users.id"))
     
     questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan")
     owner = relationship("User", back_populates="quizzes")
 
+    @property
+    def revision(self):
+        return self.document_version or 0
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -55,3 +61,82 @@ class Option(Base):
     is_correct = Column(Boolean, default=False)
     
     question = relationship("Question", back_populates="options")
+
+# --- Game Results (written asynchronously by app/results_writer.py) ---
+class GameRecord(Base):
+    __tablename__ = "games"
+
+    id = Column(Integer, primary_key=True, index=True)
+    uid = Column(String, unique=True, index=True) # In-memory session id, lets the writer batch without a round trip
+    quiz_id = Column(Integer, index=True) # No FK: results outlive a deleted quiz
+    quiz_title = Column(String)
+    user_id = Column(Integer, index=True, nullable=True) # Quiz owner at play time, kept after the quiz is deleted
+    quiz_revision = Column(Integer, nullable=True) # Quiz.revision the game was played with
+    pin = Column(String)
+    question_count = Column(Integer, default=0)
+    started_at = Column(DateTime)
+    ended_at = Column(DateTime, nullable=True)
+    finished = Column(Boolean, default=False) # False if the host left before GAME_OVER
+
+    players = relationship("GamePlayerResult", back_populates="game", cascade="all, delete-orphan")
+    answers = relationship("GameAnswer", back_populates="game", cascade="all, delete-orphan")
+
+class GamePlayerResult(Base):
+    __tablename__ = "game_players"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), index=True)
+    nickname = Column(String, index=True)
+    avatar = Column(String, nullable=True)
+    score = Column(Integer, default=0)
+    rank = Column(Integer)
+
+    game = relationship("GameRecord", back_populates="players")
+
+class GameAnswer(Base):
+    __tablename__ = "game_answers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, ForeignKey("games.id"), index=True)
+    question_index = Column(Integer)
+    nickname = Column(String)
+    answer = Column(String, nullable=True)
+    option_index = Column(Integer, nullable=True) # Chosen option in original (unshuffled) order
+    is_correct = Column(Boolean, default=False)
+    points = Column(Integer, default=0)
+    response_time = Column(Float, nullable=True) # seconds since the question went live
+    answered_at = Column(DateTime)
+
+    game = relationship("GameRecord", back_populates="answers")
+
+# --- Analytics (materialized per question, updated when a game finishes; see app/analytics.py) ---
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, index=True)
+    quiz_revision = Column(Integer, default=0) # question_index refers to this revision of the quiz
+    question_index = Column(Integer)
+    games = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    response_time_sum = Column(Float, default=0.0)
+    response_time_count = Column(Integer, default=0)
+    option_counts = Column(JSON, default={}) # {"0": n, "1": n, ...} original option order
+    # Discrimination index inputs (top/bottom 27% of players by final score, summed over games)
+    upper_n = Column(Integer, default=0)
+    upper_correct = Column(Integer, default=0)
+    lower_n = Column(Integer, default=0)
+    lower_correct = Column(Integer, default=0)
+
+# --- AI response cache (content-addressed, see app/core/ai_cache.py) ---
+class AIResponse(Base):
+    __tablename__ = "ai_responses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True) # sha256 of the normalized request
+    kind = Column(String) # preview | generate
+    response = Column(JSON)
+    created_at = Column(DateTime)
+    last_used_at = Column(DateTime, index=True)
+    hits = Column(Integer, default=0)
@@ -0,0 +1,79 @@
+# Denormalized quiz storage (QUIZ_STORAGE_MODE=document):
+# Every write also stores the whole question list as one JSON document on the
+# quizzes row, and reads that need the full quiz (hosting, editor, API,
+# duplicate) use it instead of joining questions/options. The normalized
+# tables stay in sync, so the mode can be switched at any time
+# (see migrate_quiz_documents.py).
+from app import models
+import os
+
+QUIZ_STORAGE_MODE = os.getenv("QUIZ_STORAGE_MODE", "normalized")  # normalized | document
+
+# Bump when the document layout changes; older documents are ignored (rebuilt on next save)
+DOCUMENT_FORMAT = 1
+
+def use_documents() -> bool:
+    return QUIZ_STORAGE_MODE == "document"
+
+def build_document(quiz: models.Quiz) -> dict:
+    """Builds the document from the normalized rows (ids must be flushed)."""
+    return {
+        "format": DOCUMENT_FORMAT,
+        "questions": [
+            {
+                "id": q.id,
+                "text": q.text,
+                "time_limit": q.time_limit,
+                "points": q.points,
+                "question_type": q.question_type,
+                "image_url": q.image_url,
+                "options": [{"id": o.id, "text": o.text, "is_correct": o.is_correct} for o in q.options]
+            }
+            for q in quiz.questions
+        ]
+    }
+
+def has_document(quiz: models.Quiz) -> bool:
+    doc = quiz.document
+    return bool(doc) and doc.get("format") == DOCUMENT_FORMAT
+
+def quiz_questions(quiz: models.Quiz) -> list:
+    """Question list of a quiz, from the document when enabled, else from the tables."""
+    if use_documents() and has_document(quiz):
+        return quiz.document["questions"]
+    return build_document(quiz)["questions"]
+
+def sync_document(quiz: models.Quiz):
+    """Refreshes Quiz.document and bumps the revision after a write. Caller commits.
+
+    document_version is the quiz revision in both modes: the quiz cache and
+    the editor's conflict check compare against it.
+    """
+    quiz.document_version = (quiz.document_version or 0) + 1
+    if not use_documents():
+        # Don't leave a stale document behind for when the mode is switched back on
+        if quiz.document is not None:
+            quiz.document = None
+        return
+    quiz.document = build_document(quiz)
+
+def questions_from_document(document: dict, keep_ids: bool = False) -> list:
+    """Rebuilds Question/Option rows from a document (for duplicate and migrations)."""
+    questions = []
+    for q in document.get("questions", []):
+        question = models.Question(
+            id=q.get("id") if keep_ids else None,
+            text=q.get("text"),
+            time_limit=q.get("time_limit", 20),
+            points=q.get("points", 1000),
+            question_type=q.get("question_type", "multiple_choice"),
+            image_url=q.get("image_url")
+        )
+        for opt in q.get("options", []):
+            question.options.append(models.Option(
+                id=opt.get("id") if keep_ids else None,
+                text=opt.get("text"),
+                is_correct=opt.get("is_correct", False)
+            ))
+        questions.append(question)
+    return questions
@@ -0,0 +1,188 @@
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
+from typing import Optional
+from app.database import SessionLocal
+from app import models
+from app.analytics import update_question_stats
+import asyncio
+import os
+
+# Game results are persisted write-behind: the game engine only appends events
+# to an in-memory queue (never awaits the DB on the answer path) and this
+# background task writes them in batches from the threadpool.
+GAME_RESULTS_ENABLED = os.getenv("GAME_RESULTS_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULTS_BATCH_SIZE = int(os.getenv("RESULTS_BATCH_SIZE", "200"))  # events per DB transaction
+# A failed batch is rolled back as a whole, so it can be retried safely;
+# after the last attempt it is dropped (counted in dropped_events)
+RESULTS_WRITE_RETRIES = int(os.getenv("RESULTS_WRITE_RETRIES", "2"))
+RESULTS_RETRY_DELAY = float(os.getenv("RESULTS_RETRY_DELAY", "1"))  # seconds, doubled per attempt
+
+class ResultsWriter:
+    def __init__(self, enabled: bool = GAME_RESULTS_ENABLED, batch_size: int = RESULTS_BATCH_SIZE,
+                 retries: int = RESULTS_WRITE_RETRIES, retry_delay: float = RESULTS_RETRY_DELAY):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._game_ids = {}  # session uid -> games.id
+        # Metrics
+        self.batches_written = 0
+        self.events_written = 0
+        self.answers_written = 0
+        self.failed_batches = 0
+        self.retried_batches = 0
+        self.dropped_events = 0
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drains pending events, then stops the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    # --- Producer API (called from the game engine, never blocks) ---
+    def submit(self, kind: str, payload: dict):
+        if not self.enabled:
+            return
+        if self._task is None:
+            self.start()
+        self._queue.put_nowait((kind, payload))
+
+    def game_started(self, uid: str, quiz: dict, pin: str):
+        self.submit("game_started", {
+            "uid": uid,
+            "quiz_id": quiz.get("id"),
+            "quiz_title": quiz.get("title"),
+            "quiz_revision": quiz.get("revision"),
+            "user_id": quiz.get("user_id"),
+            "pin": pin,
+            "question_count": len(quiz.get("questions", [])),
+            "started_at": datetime.utcnow()
+        })
+
+    def answers(self, uid: str, answers: list):
+        if answers:
+            self.submit("answers", {"uid": uid, "answers": answers})
+
+    def game_ended(self, uid: str, leaderboard: list, finished: bool):
+        self.submit("game_ended", {
+            "uid": uid,
+            "players": leaderboard,
+            "finished": finished,
+            "ended_at": datetime.utcnow()
+        })
+
+    # --- Consumer ---
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: list):
+        for attempt in range(self.retries + 1):
+            try:
+                answers = await run_in_threadpool(self._write, batch)
+                self.batches_written += 1
+                self.events_written += len(batch)
+                self.answers_written += answers
+                return
+            except Exception as e:
+                print(f"Results Writer Error (attempt {attempt + 1}): {e}")
+                if attempt < self.retries:
+                    self.retried_batches += 1
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        self.failed_batches += 1
+        self.dropped_events += len(batch)
+
+    def _write(self, batch: list) -> int:
+        """Writes a batch in one transaction; returns the number of answers written."""
+        db = SessionLocal()
+        new_uids = []
+        answers = 0
+        try:
+            for kind, payload in batch:
+                if kind == "game_started":
+                    game = models.GameRecord(
+                        uid=payload["uid"],
+                        quiz_id=payload["quiz_id"],
+                        quiz_title=payload["quiz_title"],
+                        quiz_revision=payload.get("quiz_revision"),
+                        user_id=payload.get("user_id"),
+                        pin=payload["pin"],
+                        question_count=payload["question_count"],
+                        started_at=payload["started_at"]
+                    )
+                    db.add(game)
+                    db.flush()
+                    self._game_ids[payload["uid"]] = game.id
+                    new_uids.append(payload["uid"])
+                    continue
+
+                game_id = self._game_id(db, payload["uid"])
+                if game_id is None:
+                    continue
+
+                if kind == "answers":
+                    db.bulk_insert_mappings(models.GameAnswer, [dict(a, game_id=game_id) for a in payload["answers"]])
+                    answers += len(payload["answers"])
+                elif kind == "game_ended":
+                    game = db.get(models.GameRecord, game_id)
+                    game.ended_at = payload["ended_at"]
+                    game.finished = payload["finished"]
+                    db.bulk_insert_mappings(models.GamePlayerResult, [
+                        {"game_id": game_id, "nickname": p["nickname"], "avatar": p.get("avatar"),
+                         "score": p["score"], "rank": rank}
+                        for rank, p in enumerate(payload["players"], 1)
+                    ])
+                    if payload["finished"]:
+                        # Refresh materialized item statistics once per game, not per dashboard view
+                        update_question_stats(db, game_id)
+                    self._game_ids.pop(payload["uid"], None)
+            db.commit()
+            return answers
+        except Exception:
+            db.rollback()
+            for uid in new_uids:
+                self._game_ids.pop(uid, None)
+            raise
+        finally:
+            db.close()
+
+    def _game_id(self, db, uid: str):
+        game_id = self._game_ids.get(uid)
+        if game_id is None:
+            row = db.query(models.GameRecord.id).filter(models.GameRecord.uid == uid).first()
+            game_id = row[0] if row else None
+        return game_id
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches_written": self.batches_written,
+            "events_written": self.events_written,
+            "answers_written": self.answers_written,
+            "failed_batches": self.failed_batches,
+            "retried_batches": self.retried_batches,
+            "dropped_events": self.dropped_events,
+        }
+
+results_writer = ResultsWriter()
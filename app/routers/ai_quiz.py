@@ -1,53 +1,73 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app import models
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from app.core.ai import API_KEY, AIError, ai_gateway, parse_model_json, QuestionStreamParser, validate_question
+from app.core.ai_cache import ai_cache, cache_key
+from app.core.auth import CachedUser, get_current_user
+from app.core.quiz_cache import quiz_cache
+from app.quiz_store import sync_document
+import asyncio
 import json
-
-load_dotenv()
+import os
 
 router = APIRouter(
     prefix="/ai",
     tags=["ai"]
 )
 
-API_KEY = os.getenv("GEMINI_API_KEY")
+PREVIEW_MAX_QUESTIONS = 20  # /preview and the single-topic form of /generate
 
-@router.post("/preview")
-async def generate_quiz_preview(
-    request: Request,
-    payload: dict = Body(...),
-    db: Session = Depends(get_db)
-):
-    """
-    Generates questions using AI and returns them as JSON (does not save to DB).
-    """
-    if not API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found.")
-        
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # We don't strictly need user object for preview, just auth check, but good practice
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
-    if not user: raise HTTPException(status_code=401, detail="User not found")
+# Large quizzes are generated in chunks of topics, several chunks at a time
+AI_MAX_QUESTIONS = int(os.getenv("AI_MAX_QUESTIONS", "60"))
+AI_CHUNK_SIZE = int(os.getenv("AI_CHUNK_SIZE", "10"))
+AI_CHUNK_FANOUT = int(os.getenv("AI_CHUNK_FANOUT", "4"))  # concurrent chunks per request
+AI_CHUNK_RETRIES = int(os.getenv("AI_CHUNK_RETRIES", "2"))  # extra attempts for a malformed chunk
 
-    topic = payload.get("topic")
-    count = payload.get("count", 5)
-    difficulty = payload.get("difficulty", "medium")
+def int_param(payload: dict, name: str, default: int) -> int:
+    """Integer field of the request body; missing/null/empty (e.g. NaN from the form) means default."""
+    value = payload.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Geçersiz değer: {name}")
 
-    question_type = payload.get("type", "multiple_choice")
-    time_limit = payload.get("time_limit", 20)
-    points = payload.get("points", 1000)
+def preview_request(payload: dict) -> dict:
+    """Normalized preview parameters (shared by the plain and streaming endpoints)."""
+    count = int_param(payload, "count", 5)
 
     # Limits
-    if count > 20: count = 20
+    if count > PREVIEW_MAX_QUESTIONS: count = PREVIEW_MAX_QUESTIONS
     if count < 1: count = 5
 
-    genai.configure(api_key=API_KEY)
+    return {
+        "topic": payload.get("topic"),
+        "count": count,
+        "difficulty": payload.get("difficulty", "medium"),
+        "question_type": payload.get("type", "multiple_choice"),
+        "time_limit": int_param(payload, "time_limit", 20),
+        "points": int_param(payload, "points", 1000),
+    }
+
+def preview_cache_key(req: dict) -> str:
+    return cache_key("preview", [req["topic"]] * req["count"], req["difficulty"],
+                     req["question_type"], req["time_limit"], req["points"])
+
+def preview_questions(raw, req: dict) -> list:
+    """Validated questions in editor shape, at most req["count"] (model replies and cache entries alike)."""
+    questions = []
+    for q in raw if isinstance(raw, list) else []:
+        q = validate_question(q, req["question_type"], req["time_limit"], req["points"])
+        if q is not None:
+            questions.append(q)
+    return questions[:req["count"]]
+
+def preview_prompt(req: dict) -> str:
+    question_type = req["question_type"]
 
     # Customize Prompt based on Type
     options_instruction = ""
@@ -73,9 +93,9 @@ async def generate_quiz_preview(
         Options: Provide 4 options, one correct.
         """
 
-    prompt = f"""
-    Create {count} quiz questions about "{topic}". 
-    Difficulty: {difficulty}.
+    return f"""
+    Create {req["count"]} quiz questions about "{req["topic"]}". 
+    Difficulty: {req["difficulty"]}.
     Question Type: {question_type}
     Language: Turkish (Türkçe).
     
@@ -85,8 +105,8 @@ async def generate_quiz_preview(
         "questions": [
             {{
                 "text": "Question text?",
-                "limit": {time_limit},
-                "points": {points},
+                "limit": {req["time_limit"]},
+                "points": {req["points"]},
                 "options": ... (see instructions below)
             }}
         ]
@@ -97,96 +117,126 @@ async def generate_quiz_preview(
     Randomize correct option position (except True/False).
     """
 
-    try:
-        # Try models in order of preference: Flash (Fast/Cheap), then Pro (Stable)
-        models_to_try = ['gemini-2.0-flash', 'gemini-2.5-flash', 'gemini-pro-latest']
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/preview")
+async def generate_quiz_preview(
+    payload: dict = Body(...),
+    user: CachedUser = Depends(get_current_user)
+):
+    """
+    Generates questions using AI and returns them as JSON (does not save to DB).
+    """
+    if not API_KEY:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found.")
         
-        response = None
-        last_error = None
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
 
-        for model_name in models_to_try:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                break
-            except Exception as e:
-                print(f"Model {model_name} failed: {e}")
-                last_error = e
-                continue
-                
-        if not response and last_error:
-            # Debugging: List available models
-            try:
-                available = [m.name for m in genai.list_models()]
-                debug_msg = f"Erişilebilir modeller: {', '.join(available)}"
-            except Exception as list_exc:
-                debug_msg = f"Model listesi alınamadı: {list_exc}"
+    req = preview_request(payload)
 
-            print(f"All models failed. {debug_msg}")
-            raise HTTPException(status_code=500, detail=f"Yapay zeka hatası: {str(last_error)}. {debug_msg}")
+    # Identical requests are served from the response cache unless "fresh" is asked for
+    key = preview_cache_key(req)
+    if payload.get("fresh"):
+        ai_cache.record_fresh()
+    else:
+        cached = await run_in_threadpool(ai_cache.get, key)
+        # Entries may predate validation on write: re-check them, and regenerate if none is usable
+        questions = preview_questions(cached.get("questions"), req) if cached is not None else []
+        if questions:
+            return JSONResponse(questions, headers={"X-AI-Cache": "HIT"})
 
-        text_resp = response.text.strip()
-        if text_resp.startswith("```"):
-            text_resp = text_resp.replace("```json", "").replace("```", "")
-        
-        data = json.loads(text_resp)
-        return data.get("questions", [])
+    try:
+        # Awaited on the SDK's async API: live games keep running during generation
+        text = await ai_gateway.generate_with_fallback(preview_prompt(req))
+        data = parse_model_json(text)
+        # Cached in the same shape as the streaming endpoint stores: validated and capped to count
+        questions = preview_questions(data.get("questions") if isinstance(data, dict) else data, req)
+        if questions:
+            await run_in_threadpool(ai_cache.put, key, "preview", {"questions": questions})
+        return JSONResponse(questions, headers={"X-AI-Cache": "MISS"})
 
     except Exception as e:
         print(f"AI Preview Error: {e}")
         raise HTTPException(status_code=500, detail=f"Yapay zeka hatası: {str(e)}")
 
-@router.post("/generate")
-async def generate_quiz_ai(
-    request: Request,
+@router.post("/preview/stream")
+async def stream_quiz_preview(
     payload: dict = Body(...),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user)
 ):
     """
-    Generates a quiz using Google Gemini AI.
-    Payload: { "topic": str, "count": int, "difficulty": str }
+    Same as /preview, but streams Server-Sent Events: one "question" event per
+    validated question as soon as the model has written it, then "done" (or "error").
     """
     if not API_KEY:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment.")
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found.")
 
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    current_user = db.query(models.User).filter(models.User.username == user_cookie).first()
-    if not current_user: raise HTTPException(status_code=401, detail="User not found")
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
 
-    topic = payload.get("topic")
-    count = payload.get("count", 5)
-    difficulty = payload.get("difficulty", "medium")
+    req = preview_request(payload)
+    key = preview_cache_key(req)
+    cached = None
+    if payload.get("fresh"):
+        ai_cache.record_fresh()
+    else:
+        cached = await run_in_threadpool(ai_cache.get, key)
+    # Entries may predate validation on write: re-check them, and regenerate if none is usable
+    cached_questions = preview_questions(cached.get("questions"), req) if cached is not None else []
 
-    # Validate limits
-    if count > 20: count = 20
-    if count < 1: count = 5
+    def accept(q, questions: list):
+        q = validate_question(q, req["question_type"], req["time_limit"], req["points"])
+        if q is None or len(questions) >= req["count"]:
+            return None
+        questions.append(q)
+        return q
 
-    # Configure Gemini
-    genai.configure(api_key=API_KEY)
-    
-    # Try models from the user's available list
-    models_to_try = ['gemini-2.0-flash', 'gemini-2.5-flash', 'gemini-pro-latest']
-    
-    response = None
-    last_error = None
-    
-    # Handle both single topic (legacy/fallback) and detailed topic list
-    topics = payload.get("topics")
-    if not topics:
-         # Fallback if frontend sends old format
-         topic = payload.get("topic", "Genel Kültür")
-         count = payload.get("count", 5)
-         # Limits for fallback count
-         if count > 20: count = 20
-         if count < 1: count = 5
-         topics = [topic] * count
+    async def events():
+        if cached_questions:
+            for q in cached_questions:
+                yield sse_event("question", q)
+            yield sse_event("done", {"count": len(cached_questions), "cached": True})
+            return
+
+        parser = QuestionStreamParser()
+        questions = []
+        chunks = []
+        try:
+            async for chunk in ai_gateway.stream_with_fallback(preview_prompt(req)):
+                chunks.append(chunk)
+                for q in parser.feed(chunk):
+                    if accept(q, questions):
+                        yield sse_event("question", questions[-1])
+
+            if not questions:
+                # Model ignored the requested shape (e.g. a bare list): parse the whole reply
+                data = parse_model_json("".join(chunks))
+                for q in data.get("questions", []) if isinstance(data, dict) else data:
+                    if accept(q, questions):
+                        yield sse_event("question", questions[-1])
+
+            if questions:
+                await run_in_threadpool(ai_cache.put, key, "preview", {"questions": questions})
+            yield sse_event("done", {"count": len(questions), "cached": False})
+
+        except Exception as e:
+            print(f"AI Stream Error: {e}")
+            yield sse_event("error", {"detail": f"Yapay zeka hatası: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
+def generate_prompt(topics: list, difficulty: str, offset: int = 0, with_title: bool = True) -> str:
     # Construct prompt for per-question topics
-    topics_str = "\n".join([f"Question {i+1} Topic: {t}" for i, t in enumerate(topics)])
+    topics_str = "\n".join([f"Question {offset+i+1} Topic: {t}" for i, t in enumerate(topics)])
+    title_fields = """
+        "title": "Yarışma Başlığı",
+        "description": "Yapay zeka ile oluşturuldu.",""" if with_title else ""
 
-    prompt = f"""
+    return f"""
     Create a quiz with exactly {len(topics)} questions.
     I will provide a specific topic for EACH question. You must follow this strictly.
     
@@ -197,9 +247,7 @@ async def generate_quiz_ai(
     
     Return ONLY a raw JSON object (no markdown formatting, no backticks).
     Structure:
-    {{
-        "title": "Yarışma Başlığı",
-        "description": "Yapay zeka ile oluşturuldu.",
+    {{{title_fields}
         "questions": [
             {{
                 "text": "Question text based on specific topic?",
@@ -217,72 +265,134 @@ async def generate_quiz_ai(
     Randomize correct option position.
     """
 
-    try:
-        for model_name in models_to_try:
+async def generate_chunk(topics: list, difficulty: str, offset: int, fanout: asyncio.Semaphore) -> dict:
+    """One chunk of a large quiz; a malformed reply is retried for this chunk only."""
+    prompt = generate_prompt(topics, difficulty, offset, with_title=offset == 0)
+    last_error = None
+    async with fanout:
+        for attempt in range(AI_CHUNK_RETRIES + 1):
+            text = await ai_gateway.generate_with_fallback(prompt)
             try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                break # Success
-            except Exception as e:
-                print(f"Model {model_name} failed: {e}")
+                data = parse_model_json(text)
+                if not isinstance(data, dict):
+                    raise ValueError("JSON nesnesi bekleniyordu")
+                questions = [validate_question(q) for q in data.get("questions", [])]
+                if len(questions) != len(topics) or None in questions:
+                    raise ValueError(f"{len(topics)} geçerli soru bekleniyordu")
+                data["questions"] = questions
+                return data
+            except ValueError as e:
+                print(f"AI Chunk {offset+1}-{offset+len(topics)} attempt {attempt+1} invalid: {e}")
                 last_error = e
-                continue
-            
-        if not response and last_error:
-            # Debugging: List available models to see what IS supported
-            try:
-                available = [m.name for m in genai.list_models()]
-                debug_msg = f"Erişilebilir modeller: {', '.join(available)}"
-            except Exception as list_exc:
-                debug_msg = f"Model listesi alınamadı: {list_exc}"
-                
-            print(f"All models failed. {debug_msg}")
-            raise HTTPException(status_code=500, detail=f"Yapay zeka hatası: {str(last_error)}. {debug_msg}")
-
-        text_resp = response.text.strip()
-        
-        # Cleanup potential markdown code blocks if the model ignores instruction
-        if text_resp.startswith("```"):
-            text_resp = text_resp.replace("```json", "").replace("```", "")
-        
-        quiz_data = json.loads(text_resp)
-        
-        # Create Quiz in DB
-        new_quiz = models.Quiz(
-            title=quiz_data.get("title", f"{topic} Yarışması"),
-            description=quiz_data.get("description", "Yapay zeka ile oluşturuldu."),
-            user_id=current_user.id,
-            theme="standard",
-            settings={"music_theme": "energetic"}
-        )
-        db.add(new_quiz)
-        db.flush()
-
-        # Create Questions
-        for q in quiz_data.get("questions", []):
-            question = models.Question(
-                quiz_id=new_quiz.id,
-                text=q.get("text"),
-                question_type="multiple_choice",
-                time_limit=q.get("limit", 20),
-                points=q.get("points", 1000),
-                image_url=None
-            )
-            
-            # Create Options objects
-            for opt in q.get("options", []):
-                question.options.append(models.Option(
-                    text=opt.get("text"),
-                    is_correct=opt.get("is_correct")
-                ))
-            
-            db.add(question)
-        
-        db.commit()
-        db.refresh(new_quiz)
-        
-        return {"id": new_quiz.id, "message": "Yarışma oluşturuldu!"}
+    raise AIError(f"Soru {offset+1}-{offset+len(topics)} üretilemedi: {last_error}")
+
+async def generate_quiz_data(topics: list, difficulty: str) -> dict:
+    """Generates chunks concurrently (bounded fan-out) and merges them in topic order."""
+    fanout = asyncio.Semaphore(AI_CHUNK_FANOUT)
+    tasks = [
+        asyncio.create_task(generate_chunk(topics[i:i + AI_CHUNK_SIZE], difficulty, i, fanout))
+        for i in range(0, len(topics), AI_CHUNK_SIZE)
+    ]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    quiz_data = {k: v for k, v in chunks[0].items() if k != "questions"}
+    quiz_data["questions"] = [q for chunk in chunks for q in chunk["questions"]]
+    return quiz_data
+
+@router.post("/generate")
+async def generate_quiz_ai(
+    payload: dict = Body(...),
+    db: Session = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Generates a quiz using Google Gemini AI.
+    Payload: { "topics": [str], "difficulty": str, "fresh": bool } (or legacy { "topic": str, "count": int })
+    """
+    if not API_KEY:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not found in environment.")
+
+    if not current_user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    topic = payload.get("topic")
+    difficulty = payload.get("difficulty", "medium")
+
+    # Handle both single topic (legacy/fallback) and detailed topic list
+    topics = payload.get("topics")
+    if not topics:
+         # Fallback if frontend sends old format
+         topic = payload.get("topic", "Genel Kültür")
+         count = int_param(payload, "count", 5)
+         # Same limits as /preview, which this form mirrors
+         if count > PREVIEW_MAX_QUESTIONS: count = PREVIEW_MAX_QUESTIONS
+         if count < 1: count = 5
+         topics = [topic] * count
+    topics = topics[:AI_MAX_QUESTIONS]
+
+    try:
+        fresh = bool(payload.get("fresh"))
+        key = cache_key("generate", topics, difficulty)
+        quiz_data = None
+        if fresh:
+            ai_cache.record_fresh()
+        else:
+            quiz_data = await run_in_threadpool(ai_cache.get, key)
+
+        if quiz_data is None:
+            quiz_data = await generate_quiz_data(topics, difficulty)
+            await run_in_threadpool(ai_cache.put, key, "generate", quiz_data)
+
+        # DB writes are blocking too: run them in the threadpool
+        new_quiz_id = await run_in_threadpool(save_generated_quiz, db, current_user.id, quiz_data, topic)
+        return {"id": new_quiz_id, "message": "Yarışma oluşturuldu!"}
 
     except Exception as e:
         print(f"AI Generation Error: {e}")
         raise HTTPException(status_code=500, detail=f"Yapay zeka hatası: {str(e)}")
+
+def save_generated_quiz(db: Session, user_id: int, quiz_data: dict, topic: str = None) -> int:
+    """Persists a generated quiz; returns its id."""
+    # Create Quiz in DB
+    new_quiz = models.Quiz(
+        title=quiz_data.get("title", f"{topic} Yarışması"),
+        description=quiz_data.get("description", "Yapay zeka ile oluşturuldu."),
+        user_id=user_id,
+        theme="standard",
+        settings={"music_theme": "energetic"}
+    )
+    db.add(new_quiz)
+    db.flush()
+
+    # Create Questions (merged chunks go in with one flush)
+    questions = []
+    for q in quiz_data.get("questions", []):
+        question = models.Question(
+            quiz_id=new_quiz.id,
+            text=q.get("text"),
+            question_type="multiple_choice",
+            time_limit=q.get("time_limit", q.get("limit", 20)),
+            points=q.get("points", 1000),
+            image_url=None
+        )
+        
+        # Create Options objects
+        for opt in q.get("options", []):
+            question.options.append(models.Option(
+                text=opt.get("text"),
+                is_correct=opt.get("is_correct")
+            ))
+        
+        questions.append(question)
+
+    db.add_all(questions)
+    db.flush()
+    sync_document(new_quiz)
+    db.commit()
+    db.refresh(new_quiz)
+    quiz_cache.invalidate(new_quiz.id)
+    return new_quiz.id
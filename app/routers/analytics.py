@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app import models
+from app.core.auth import CachedUser, get_current_user
+from app.analytics import question_report, student_trend
+from app.quiz_store import quiz_questions
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
+@router.get("/quizzes/{quiz_id}")
+def quiz_analytics(quiz_id: int, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
+    """Item analysis for a quiz: difficulty, discrimination, distractor rates, response times."""
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user.id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    # Only games played with the current questions; older revisions had different questions
+    games = db.query(func.count(models.GameRecord.id)).filter(
+        models.GameRecord.quiz_id == quiz_id, models.GameRecord.finished == True,
+        func.coalesce(models.GameRecord.quiz_revision, 0) == quiz.revision
+    ).scalar()
+
+    questions = quiz_questions(quiz)
+    stats = db.query(models.QuestionStats).filter(
+        models.QuestionStats.quiz_id == quiz_id, models.QuestionStats.quiz_revision == quiz.revision
+    ).order_by(models.QuestionStats.question_index).all()
+
+    report = []
+    for s in stats:
+        item = question_report(s)
+        # Same revision, so the indexes match the current question list
+        if 0 <= s.question_index < len(questions):
+            q = questions[s.question_index]
+            item["text"] = q["text"]
+            item["options"] = [o["text"] for o in q["options"]]
+        report.append(item)
+
+    return {
+        "quiz_id": quiz_id,
+        "title": quiz.title,
+        "revision": quiz.revision,
+        "games": games or 0,
+        "questions": report
+    }
+
+@router.get("/students")
+def student_analytics(nickname: str, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
+    """Score/accuracy trend of one player nickname across the teacher's sessions."""
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    return {
+        "nickname": nickname,
+        "sessions": student_trend(db, user.id, nickname)
+    }
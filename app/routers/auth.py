@@ -3,9 +3,9 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
 from .. import models
-from ..database import get_db
-from .. import models
 from app.core.templates import templates
+from app.core.page_cache import page_cache
+from app.core.auth import CachedUser, get_current_user, user_cache
 
 router = APIRouter()
 # templates = Jinja2Templates(directory="app/templates") -> Imported from core
@@ -13,10 +13,10 @@ router = APIRouter()
 # --- LOGIN ---
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return page_cache.render(request, "login.html")
 
 @router.post("/login")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.username == username).first()
     
     if not user or user.password != password:
@@ -39,10 +39,10 @@ async def login(request: Request, username: str = Form(...), password: str = For
 # --- REGISTER ---
 @router.get("/register", response_class=HTMLResponse)
 async def register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return page_cache.render(request, "register.html")
 
 @router.post("/register")
-async def register(
+def register(
     request: Request, 
     username: str = Form(...), 
     password: str = Form(...), 
@@ -74,7 +74,7 @@ async def register(
     return templates.TemplateResponse("register.html", {"request": request, "success": "Kayıt başarılı! Yönetici onayı bekleniyor."})
 
 @router.post("/auth/update")
-async def update_profile(
+def update_profile(
     request: Request,
     first_name: str = Form(...),
     last_name: str = Form(...),
@@ -101,6 +101,7 @@ async def update_profile(
         user.password = password
         
     db.commit()
+    user_cache.invalidate(user_cookie, user.username)
     
     # If username changed, update cookie (or just redirect which might be weird if cookie mismatch)
     # Ideally we should update the cookie if username changed.
@@ -119,12 +120,10 @@ async def logout(request: Request):
 
 # --- SUPER ADMIN ---
 @router.get("/super-admin", response_class=HTMLResponse)
-async def super_admin_dashboard(request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+def super_admin_dashboard(request: Request, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
     # Verify Super Admin
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not user or user.role != 'super_admin':
         return RedirectResponse("/host")
     
@@ -155,11 +154,9 @@ async def super_admin_dashboard(request: Request, db: Session = Depends(get_db))
     })
 
 @router.post("/super-admin/approve/{user_id}")
-async def approve_user(user_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+def approve_user(user_id: int, request: Request, db: Session = Depends(get_db), admin: CachedUser = Depends(get_current_user)):
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
-    admin = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not admin or admin.role != 'super_admin':
         return RedirectResponse("/host")
         
@@ -167,28 +164,29 @@ async def approve_user(user_id: int, request: Request, db: Session = Depends(get
     if user_to_approve:
         user_to_approve.is_approved = True
         db.commit()
+        user_cache.invalidate(user_to_approve.username)
         
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/super-admin/reject/{user_id}")
-async def reject_user(user_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+def reject_user(user_id: int, request: Request, db: Session = Depends(get_db), admin: CachedUser = Depends(get_current_user)):
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
-    admin = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not admin or admin.role != 'super_admin':
         return RedirectResponse("/host")
         
     user_to_delete = db.query(models.User).filter(models.User.id == user_id).first()
     if user_to_delete:
+         username = user_to_delete.username
          db.delete(user_to_delete)
          db.commit()
+         user_cache.invalidate(username)
         
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/super-admin/edit/{user_id}")
-async def edit_user(
+def edit_user(
     user_id: int, 
     request: Request, 
     username: str = Form(None),
@@ -197,17 +195,17 @@ async def edit_user(
     last_name: str = Form(None),
     email: str = Form(None),
     phone: str = Form(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    admin: CachedUser = Depends(get_current_user)
 ):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
-    admin = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not admin or admin.role != 'super_admin':
         return RedirectResponse("/host")
         
     user_to_edit = db.query(models.User).filter(models.User.id == user_id).first()
     if user_to_edit:
+        old_username = user_to_edit.username
         if username: user_to_edit.username = username
         if password and len(password) > 0: user_to_edit.password = password
         if first_name: user_to_edit.first_name = first_name
@@ -215,6 +213,7 @@ async def edit_user(
         if email: user_to_edit.email = email
         if phone: user_to_edit.phone = phone
         db.commit()
+        user_cache.invalidate(old_username, user_to_edit.username)
     
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
 
@@ -224,15 +223,16 @@ import string
 
 @router.get("/forgot-password", response_class=HTMLResponse)
 async def forgot_password_page(request: Request):
-    return templates.TemplateResponse("forgot_password.html", {"request": request})
+    return page_cache.render(request, "forgot_password.html")
 
 @router.post("/forgot-password")
-async def forgot_password_submit(request: Request, email: str = Form(...), db: Session = Depends(get_db)):
+def forgot_password_submit(request: Request, email: str = Form(...), db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.email == email).first()
     
     if user:
         user.reset_requested = True
         db.commit()
+        user_cache.invalidate(user.username)
     
     # Always show success message for security (user enumeration prevention)
     return templates.TemplateResponse("forgot_password.html", {
@@ -242,11 +242,9 @@ async def forgot_password_submit(request: Request, email: str = Form(...), db: S
 
 # --- SUPER ADMIN UPDATE ---
 @router.post("/super-admin/reset-approve/{user_id}")
-async def approve_password_reset(user_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+def approve_password_reset(user_id: int, request: Request, db: Session = Depends(get_db), admin: CachedUser = Depends(get_current_user)):
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
-    admin = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not admin or admin.role != 'super_admin':
         return RedirectResponse("/host")
         
@@ -258,6 +256,7 @@ async def approve_password_reset(user_id: int, request: Request, db: Session = D
         user.password = new_password
         user.reset_requested = False
         db.commit()
+        user_cache.invalidate(user.username)
         
         # We need to show this password to the Admin!
         # Redirect back with a query param or render template directly? 
@@ -291,11 +290,9 @@ async def approve_password_reset(user_id: int, request: Request, db: Session = D
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/super-admin/reset-reject/{user_id}")
-async def reject_password_reset(user_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
+def reject_password_reset(user_id: int, request: Request, db: Session = Depends(get_db), admin: CachedUser = Depends(get_current_user)):
+    if not request.cookies.get("user_session"): return RedirectResponse("/login")
     
-    admin = db.query(models.User).filter(models.User.username == user_cookie).first()
     if not admin or admin.role != 'super_admin':
         return RedirectResponse("/host")
         
@@ -303,5 +300,6 @@ async def reject_password_reset(user_id: int, request: Request, db: Session = De
     if user:
         user.reset_requested = False
         db.commit()
+        user_cache.invalidate(user.username)
         
     return RedirectResponse(url="/super-admin", status_code=status.HTTP_303_SEE_OTHER)
@@ -0,0 +1,186 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from itertools import groupby
+from app.database import get_db, SessionLocal
+from app import models
+from app.core.auth import CachedUser, get_current_user
+from app.core.excel import EXPORT_HEADERS, GROUP_HEADER, XLSX_MEDIA_TYPE, question_to_row, write_xlsx
+import csv
+import io
+import json
+import os
+import tempfile
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"]
+)
+
+# xlsx/csv use the import template columns plus "Soru Tipi" and "Görsel URL",
+# so an exported xlsx can be imported back without losing question types or
+# images. CSV is export-only (the importer reads .xlsx).
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_FORMATS = {
+    "xlsx": (XLSX_MEDIA_TYPE, "xlsx"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+def iter_questions(quiz_ids: list):
+    """
+    Yields (quiz_id, quiz_title, question_id, text, time_limit, points, question_type, image_url, options)
+    one question at a time.
+    Rows come from a server-side cursor in batches, so memory stays flat for large banks.
+    """
+    # Own session: the response body is produced after the request dependencies have closed
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                models.Quiz.id, models.Quiz.title,
+                models.Question.id, models.Question.text, models.Question.time_limit, models.Question.points,
+                models.Question.question_type, models.Question.image_url,
+                models.Option.text, models.Option.is_correct
+            )
+            .join(models.Question, models.Question.quiz_id == models.Quiz.id)
+            .outerjoin(models.Option, models.Option.question_id == models.Question.id)
+            .filter(models.Quiz.id.in_(quiz_ids))
+            .order_by(models.Quiz.id, models.Question.id, models.Option.id)
+            .execution_options(stream_results=True)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for _, rows in groupby(query, key=lambda r: r[2]):
+            rows = list(rows)
+            quiz_id, quiz_title, question_id, text, time_limit, points, question_type, image_url = rows[0][:8]
+            options = [(r[8], r[9]) for r in rows if r[8] is not None]
+            yield quiz_id, quiz_title, question_id, text, time_limit, points, question_type, image_url, options
+    finally:
+        db.close()
+
+def template_rows(quiz_ids: list, grouped: bool):
+    """Rows in EXPORT_HEADERS layout (+ GROUP_HEADER column for multi-quiz exports)."""
+    for quiz_id, quiz_title, _, text, time_limit, points, question_type, image_url, options in iter_questions(quiz_ids):
+        row = question_to_row(text, time_limit, points, options, question_type, image_url)
+        if grouped:
+            row.append(quiz_title)
+        yield row
+
+def stream_csv(quiz_ids: list, grouped: bool):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")  # BOM so Excel opens Turkish characters correctly
+    writer.writerow(EXPORT_HEADERS + ([GROUP_HEADER] if grouped else []))
+    for row in template_rows(quiz_ids, grouped):
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def stream_ndjson(quiz_ids: list):
+    for quiz_id, quiz_title, question_id, text, time_limit, points, question_type, image_url, options in iter_questions(quiz_ids):
+        yield (json.dumps({
+            "quiz_id": quiz_id,
+            "quiz_title": quiz_title,
+            "id": question_id,
+            "text": text,
+            "time_limit": time_limit,
+            "points": points,
+            "question_type": question_type,
+            "image_url": image_url,
+            "options": [{"text": o_text, "is_correct": o_correct} for o_text, o_correct in options]
+        }, ensure_ascii=False) + "\n").encode("utf-8")
+
+def iter_file(path: str):
+    """Streams a finished file back in chunks, then deletes it."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+def write_export_xlsx(path: str, quiz_ids: list, grouped: bool):
+    """Streams rows from the DB cursor into a write-only workbook (blocking).
+
+    Neither side holds the whole export: yield_per batches go straight to
+    openpyxl, which flushes them to disk.
+    """
+    headers = EXPORT_HEADERS + ([GROUP_HEADER] if grouped else [])
+    write_xlsx(path, template_rows(quiz_ids, grouped), headers)
+
+async def build_xlsx(quiz_ids: list, grouped: bool) -> str:
+    """Writes the workbook to a temp file in the threadpool and returns its path.
+
+    Not in the job pool: the rows come from this process's DB session, and
+    shipping them to a worker process would mean materializing them first.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    tmp.close()
+    try:
+        await run_in_threadpool(write_export_xlsx, tmp.name, quiz_ids, grouped)
+    except Exception:
+        os.remove(tmp.name)
+        raise
+    return tmp.name
+
+async def export_response(quiz_ids: list, fmt: str, filename: str, grouped: bool):
+    if fmt == "json":
+        fmt = "ndjson"
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Desteklenen formatlar: xlsx, csv, ndjson")
+    media_type, ext = EXPORT_FORMATS[fmt]
+
+    if fmt == "csv":
+        body = stream_csv(quiz_ids, grouped)
+    elif fmt == "ndjson":
+        body = stream_ndjson(quiz_ids)
+    else:
+        body = iter_file(await build_xlsx(quiz_ids, grouped))
+
+    # Sync generators are iterated in the threadpool by StreamingResponse
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}.{ext}"}
+    )
+
+@router.get("/{quiz_id}")
+async def export_quiz(
+    quiz_id: int,
+    format: str = "xlsx",
+    db: Session = Depends(get_db),
+    user: CachedUser = Depends(get_current_user)
+):
+    """Exports one quiz in the import template layout (xlsx/csv) or as NDJSON."""
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    quiz = await run_in_threadpool(
+        lambda: db.query(models.Quiz.id).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user.id).first()
+    )
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    return await export_response([quiz_id], format, f"quiz_{quiz_id}", grouped=False)
+
+@router.get("")
+async def export_all_quizzes(
+    format: str = "xlsx",
+    db: Session = Depends(get_db),
+    user: CachedUser = Depends(get_current_user)
+):
+    """Exports all quizzes of the current teacher; rows carry the quiz title in the 'Yarışma' column."""
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    quiz_ids = await run_in_threadpool(
+        lambda: [row[0] for row in db.query(models.Quiz.id).filter(models.Quiz.user_id == user.id).all()]
+    )
+    return await export_response(quiz_ids, format, "quizler", grouped=True)
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
 # from fastapi.templating import Jinja2Templates
 from app.core.templates import templates
+from app.core.page_cache import page_cache
 from sqlalchemy.orm import Session
 from ..database import get_db, SessionLocal
 from .. import models, schemas
 from ..game_manager import game_manager
+from ..quiz_store import quiz_questions, use_documents
 import json
 
 router = APIRouter()
@@ -19,10 +22,53 @@ async def player_join_page(request: Request, pin: str = None):
         from fastapi.responses import RedirectResponse
         return RedirectResponse(url="/", status_code=303)
     
-    return templates.TemplateResponse("player_join.html", {
-        "request": request,
-        "pin": pin
-    })
+    # Same HTML for every game: the page reads the PIN from the URL
+    return page_cache.render(request, "player_join.html")
+
+def load_quiz_data(quiz_id: int):
+    """Loads a quiz with questions/options as a plain dict for the game engine (blocking)."""
+    from sqlalchemy.orm import joinedload
+
+    # Manual Session Management
+    db = SessionLocal()
+    try:
+        if use_documents():
+            # Single-row read; falls back to the tables if the document is missing
+            quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+        else:
+            # Fetch Quiz Data Eagerly to prevent lazy load errors
+            quiz = db.query(models.Quiz).options(
+                joinedload(models.Quiz.questions).joinedload(models.Question.options)
+            ).filter(models.Quiz.id == quiz_id).first()
+
+        if not quiz:
+            return None
+
+        # Convert to dict
+        quiz_data = {
+            "id": quiz.id,
+            "title": quiz.title,
+            "revision": quiz.revision,
+            "user_id": quiz.user_id,
+            "theme": quiz.theme,
+            "settings": dict(quiz.settings or {}),
+            "questions": []
+        }
+
+        for q in quiz_questions(quiz):
+            q_data = {
+                "text": q["text"],
+                "time": q["time_limit"],
+                "points": q["points"],
+                "type": q["question_type"],
+                "image": q["image_url"],
+                "options": [{"text": o["text"], "is_correct": o["is_correct"]} for o in q["options"]]
+            }
+            quiz_data["questions"].append(q_data)
+
+        return quiz_data
+    finally:
+        db.close()
 
 @router.websocket("/ws/host/{quiz_id}")
 async def websocket_host(websocket: WebSocket, quiz_id: int):
@@ -36,50 +82,23 @@ async def websocket_host(websocket: WebSocket, quiz_id: int):
     show_q = qp.get("show_questions") == 'true'
     shuffle_opt = qp.get("shuffle") == 'true'
 
-    # Manual Session Management
-    db = SessionLocal()
-    
     try:
-        from sqlalchemy.orm import joinedload
-        
-        # Fetch Quiz Data Eagerly to prevent lazy load errors
+        # DB I/O runs in the threadpool so other games keep receiving traffic
         print(f"WS HOST: Fetching quiz {quiz_id}...")
-        quiz = db.query(models.Quiz).options(
-            joinedload(models.Quiz.questions).joinedload(models.Question.options)
-        ).filter(models.Quiz.id == quiz_id).first()
-        
-        if not quiz:
+        quiz_data = await run_in_threadpool(load_quiz_data, quiz_id)
+
+        if not quiz_data:
             print(f"WS HOST: Quiz {quiz_id} not found")
             await websocket.close(code=4004)
             return
 
-        print(f"WS HOST: Quiz found: {quiz.title}")
-        
+        print(f"WS HOST: Quiz found: {quiz_data['title']}")
+
         # Prepare Settings (Merge DB settings with overrides)
-        current_settings = quiz.settings or {}
+        current_settings = quiz_data["settings"]
         if "show_questions" in qp: current_settings['show_question_on_player'] = show_q
         if "shuffle" in qp: current_settings['shuffle_options'] = shuffle_opt
 
-        # Convert to dict
-        quiz_data = {
-            "id": quiz.id,
-            "title": quiz.title,
-            "theme": quiz.theme,
-            "settings": current_settings,
-            "questions": []
-        }
-        
-        for q in quiz.questions:
-            q_data = {
-                "text": q.text,
-                "time": q.time_limit,
-                "points": q.points,
-                "type": q.question_type,
-                "image": q.image_url,
-                "options": [{"text": o.text, "is_correct": o.is_correct} for o in q.options]
-            }
-            quiz_data["questions"].append(q_data)
-
         # Creative Game Session
         print("WS HOST: Creating game session...")
         pin = await game_manager.create_game(quiz_data, websocket, custom_pin=custom_pin)
@@ -91,6 +110,11 @@ async def websocket_host(websocket: WebSocket, quiz_id: int):
             "pin": pin,
             "settings": current_settings
         })
+
+        # Warm the projector's cache with the first question's media while in the lobby
+        prefetch = game_manager.prefetch_message(game_manager.get_game(pin), 0, "host")
+        if prefetch:
+            await websocket.send_json(prefetch)
         
         # Loop
         while True:
@@ -115,9 +139,6 @@ async def websocket_host(websocket: WebSocket, quiz_id: int):
         try:
             await websocket.close(code=1011)
         except: pass
-    finally:
-        print(f"WS HOST: Closing DB session for {quiz_id}")
-        db.close()
 
 @router.websocket("/ws/player/{pin}/{nickname}")
 async def websocket_player(websocket: WebSocket, pin: str, nickname: str):
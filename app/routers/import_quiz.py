@@ -1,223 +1,263 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
-import openpyxl
-from io import BytesIO
+from app.core.auth import CachedUser, get_current_user
+from app.core.quiz_cache import quiz_cache
+from app.core.excel import (
+    TEMPLATE_VARIANTS, DEFAULT_TEMPLATE_LANG, XLSX_MEDIA_TYPE,
+    ExcelFormatError, build_template, parse_questions_file, parse_workbook
+)
+from app.core.workers import job_pool
+from app.quiz_store import sync_document
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
+import time
 
 router = APIRouter(
     prefix="/import",
     tags=["import"]
 )
 
-TEMPLATE_HEADERS = [
-    "Soru Metni", 
-    "Süre (sn)", 
-    "Puan (1000/2000/0)", 
-    "A Seçeneği", 
-    "B Seçeneği", 
-    "C Seçeneği", 
-    "D Seçeneği", 
-    "Doğru Cevap (A/B/C/D)"
-]
+# Template bytes never change for a given build, so each language variant is
+# generated once (lazily, in the job pool) and then served from memory.
+TEMPLATE_VERSION = "1"
+_template_cache = {}  # lang -> (bytes, etag)
+
+def template_etag(lang: str) -> str:
+    # Derived from the variant definition (not the xlsx bytes, which embed a timestamp),
+    # so every worker/restart hands out the same ETag
+    spec = json.dumps(TEMPLATE_VARIANTS[lang], ensure_ascii=False, sort_keys=True)
+    return '"tpl-%s-%s"' % (lang, hashlib.sha1((TEMPLATE_VERSION + spec).encode("utf-8")).hexdigest()[:16])
+
+TEMPLATE_ETAGS = {lang: template_etag(lang) for lang in TEMPLATE_VARIANTS}
+
+def pick_template_lang(request: Request, lang: str = None) -> str:
+    if lang in TEMPLATE_VARIANTS:
+        return lang
+    for part in request.headers.get("accept-language", "").split(","):
+        code = part.split(";")[0].strip().lower()[:2]
+        if code in TEMPLATE_VARIANTS:
+            return code
+    return DEFAULT_TEMPLATE_LANG
+
+async def get_template_bytes(lang: str):
+    cached = _template_cache.get(lang)
+    if cached is None:
+        content = await job_pool.run(build_template, lang)
+        cached = _template_cache.setdefault(lang, (content, TEMPLATE_ETAGS[lang]))
+    return cached
 
 @router.get("/template")
-def get_template():
-    """Generates and returns a sample Excel template for quiz import."""
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Soru Şablonu"
-    
-    # Write Headers
-    for col_num, header in enumerate(TEMPLATE_HEADERS, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = openpyxl.styles.Font(bold=True)
-        # Adjust column width
-        ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = 20
-
-    # Write Sample Data
-    sample_data = [
-        ["Türkiye'nin başkenti neresidir?", 20, 1000, "İstanbul", "Ankara", "İzmir", "Bursa", "B"],
-        ["Python dili hangi yıl çıkmıştır?", 30, 2000, "1989", "1991", "2000", "1995", "B"],
-        ["Su kaç derecede kaynar?", 15, 1000, "100", "90", "80", "50", "A"]
-    ]
-
-    for row_idx, row_data in enumerate(sample_data, 2):
-        for col_idx, value in enumerate(row_data, 1):
-            ws.cell(row=row_idx, column=col_idx, value=value)
-
-    # Save to buffer
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    return StreamingResponse(
-        buffer, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=quiz_sablon.xlsx"}
-    )
+async def get_template(request: Request, lang: str = None):
+    """Returns the sample Excel template for quiz import (?lang=tr|en, else Accept-Language)."""
+    lang = pick_template_lang(request, lang)
+    etag = TEMPLATE_ETAGS[lang]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=86400",
+        "Vary": "Accept-Language",
+        "Content-Disposition": f"attachment; filename={TEMPLATE_VARIANTS[lang]['filename']}"
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    content, _ = await get_template_bytes(lang)
+    return Response(content, media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+# Upload limits (the file is spooled to disk and read row by row, so memory stays flat)
+MAX_UPLOAD_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_IMPORT_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "5000"))
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Bulk (question bank) imports: many sheets / quizzes in one file
+MAX_BULK_BYTES = int(os.getenv("IMPORT_MAX_BULK_BYTES", str(50 * 1024 * 1024)))
+MAX_BULK_ROWS = int(os.getenv("IMPORT_MAX_BULK_ROWS", "50000"))
+BULK_TIMEOUT = float(os.getenv("IMPORT_BULK_TIMEOUT", "300"))
+
+def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Copies the upload to a temp file in chunks, enforcing max_bytes. Returns the path."""
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    size = 0
+    try:
+        with tmp:
+            while True:
+                chunk = file.file.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Dosya çok büyük (en fazla {max_bytes // (1024 * 1024)} MB).")
+                tmp.write(chunk)
+    except Exception:
+        os.remove(tmp.name)
+        raise
+    return tmp.name
+
+async def parse_upload(file: UploadFile, strict: bool) -> list:
+    """Spools the upload (threadpool) and parses it in the job pool; maps errors to HTTP."""
+    path = await run_in_threadpool(spool_upload, file)
+    try:
+        return await job_pool.run(parse_questions_file, path, strict, MAX_IMPORT_ROWS)
+    except ExcelFormatError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Dosya işleme zaman aşımına uğradı.")
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # a timed-out worker may still hold the file (Windows)
 
 @router.post("/parse")
 async def parse_quiz_excel(
-    request: Request,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(get_current_user)
 ):
     """Parses Excel and returns list of questions (no DB save)."""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Sadece .xlsx dosyaları kabul edilir.")
         
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Just verify existence
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
-    if not user: raise HTTPException(status_code=401, detail="User not found")
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        contents = await file.read()
-        wb = openpyxl.load_workbook(filename=BytesIO(contents), data_only=True)
-        ws = wb.active
-        
-        header_row = [cell.value for cell in ws[1]]
-        if not header_row or header_row[0] != TEMPLATE_HEADERS[0]:
-            raise HTTPException(status_code=400, detail="Geçersiz şablon.")
-
-        questions = []
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]: continue
-            
-            q_text = str(row[0] or "").strip()
-            time_limit = int(row[1] or 20)
-            points = int(row[2] or 1000)
-            
-            opt_a = str(row[3] or "").strip()
-            opt_b = str(row[4] or "").strip()
-            opt_c = str(row[5] or "").strip()
-            opt_d = str(row[6] or "").strip()
-            
-            correct_char = str(row[7] or "").strip().upper()
-            mapping = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
-            correct_idx = mapping.get(correct_char, -1)
-            
-            if correct_idx == -1 and (opt_a or opt_b):
-                 # For preview/parse, we can be slightly more lenient or just mark none, 
-                 # but let's conform to the strict rule we just added or handle it on frontend.
-                 # Let's return -1 and let frontend warn if needed, or just raise here too.
-                 pass 
-
-            questions.append({
-                "text": q_text,
-                "time_limit": time_limit,
-                "points": points,
-                "question_type": "multiple_choice",
-                "image_url": None,
-                "options": [
-                    {"text": opt_a, "is_correct": correct_idx == 0},
-                    {"text": opt_b, "is_correct": correct_idx == 1},
-                    {"text": opt_c, "is_correct": correct_idx == 2},
-                    {"text": opt_d, "is_correct": correct_idx == 3},
-                ]
-            })
-            
-        return questions
-
+        return await parse_upload(file, strict=False)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Parse Error: {e}")
         raise HTTPException(status_code=500, detail=f"Dosya okunamadı: {str(e)}")
 
+def save_imported_quiz(db: Session, user_id: int, title: str, questions: list,
+                       description: str = "Excel ile otomatik oluşturuldu") -> models.Quiz:
+    """Writes a parsed question list as a new quiz in one transaction (blocking, run in the threadpool).
+
+    Rolls back itself on failure, so the session is never touched from the event loop.
+    """
+    try:
+        return _save_imported_quiz(db, user_id, title, questions, description)
+    except Exception:
+        db.rollback()
+        raise
+
+def _save_imported_quiz(db: Session, user_id: int, title: str, questions: list, description: str) -> models.Quiz:
+    new_quiz = models.Quiz(
+        title=title,
+        description=description,
+        user_id=user_id,
+        theme="standard",
+        settings={"music_theme": "energetic"}
+    )
+    # Whole object graph is flushed at once, so the ORM batches the INSERTs
+    for q in questions:
+        question = models.Question(
+            text=q["text"],
+            question_type=q["question_type"],
+            time_limit=q["time_limit"],
+            points=q["points"],
+            image_url=q.get("image_url")
+        )
+        for opt in q["options"]:
+            question.options.append(models.Option(text=opt["text"], is_correct=opt["is_correct"]))
+        new_quiz.questions.append(question)
+    db.add(new_quiz)
+
+    db.flush()
+    sync_document(new_quiz)
+    db.commit()
+    db.refresh(new_quiz)
+    quiz_cache.invalidate(new_quiz.id)
+    return new_quiz
+
 @router.post("/upload")
 async def import_quiz(
-    request: Request,
     file: UploadFile = File(...),
     title: str = "Excel İle Yüklenen Yarışma",
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
     """Parses an uploaded Excel file and creates a quiz."""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Sadece .xlsx dosyaları kabul edilir.")
 
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    current_user = db.query(models.User).filter(models.User.username == user_cookie).first()
-    if not current_user: raise HTTPException(status_code=401, detail="User not found")
+    if not current_user: raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        contents = await file.read()
-        wb = openpyxl.load_workbook(filename=BytesIO(contents), data_only=True)
-        ws = wb.active
-        
-        # Validate headers
-        header_row = [cell.value for cell in ws[1]]
-        # Basic check if headers match roughly (at least first column)
-        if not header_row or header_row[0] != TEMPLATE_HEADERS[0]:
-            raise HTTPException(status_code=400, detail="Geçersiz şablon formatı. Lütfen sağlanan şablonu kullanın.")
-
-        new_quiz = models.Quiz(
-            title=title,
-            description="Excel ile otomatik oluşturuldu",
-            user_id=current_user.id,
-            theme="standard",
-            settings={"music_theme": "energetic"}
-        )
-        db.add(new_quiz)
-        db.flush() # get ID
-
-        # Iterate rows
-        questions_created = 0
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]: # Skip empty question text
-                continue
-            
-            # Unpack row
-            # Expected: q_text, time, points, optA, optB, optC, optD, correct_letter
-            q_text = str(row[0] or "").strip()
-            time_limit = int(row[1] or 20)
-            points = int(row[2] or 1000)
-            
-            # Options
-            opt_a = str(row[3] or "").strip()
-            opt_b = str(row[4] or "").strip()
-            opt_c = str(row[5] or "").strip()
-            opt_d = str(row[6] or "").strip()
-            
-            correct_char = str(row[7] or "").strip().upper()
-            
-            # Map correct char to index
-            mapping = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
-            correct_idx = mapping.get(correct_char, -1) # -1 if invalid
-            
-            if correct_idx == -1 and (opt_a or opt_b):
-                 raise HTTPException(status_code=400, detail=f"Satır {row[0]}: Geçersiz doğru cevap şıkkı '{correct_char}'. Lütfen sadece A, B, C veya D giriniz.")
-
-            options_list = [
-                {"text": opt_a, "is_correct": correct_idx == 0},
-                {"text": opt_b, "is_correct": correct_idx == 1},
-                {"text": opt_c, "is_correct": correct_idx == 2},
-                {"text": opt_d, "is_correct": correct_idx == 3},
-            ]
-            
-            question = models.Question(
-                quiz_id=new_quiz.id,
-                text=q_text,
-                question_type="multiple_choice",
-                time_limit=time_limit,
-                points=points,
-                options=options_list,
-                image_url=None
-            )
-            db.add(question)
-            questions_created += 1
-
-        db.commit()
-        db.refresh(new_quiz)
+        questions = await parse_upload(file, strict=True)
+        new_quiz = await run_in_threadpool(save_imported_quiz, db, current_user.id, title, questions)
         
-        return {"message": "Başarılı", "quiz_id": new_quiz.id, "questions_count": questions_created}
+        return {"message": "Başarılı", "quiz_id": new_quiz.id, "questions_count": len(questions)}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
         print(f"Import Error: {e}")
         raise HTTPException(status_code=500, detail=f"Dosya işlenirken hata: {str(e)}")
+
+def save_bulk_import(db: Session, user_id: int, report: dict) -> dict:
+    """Saves every error-free quiz of a bulk import, one transaction per quiz."""
+    created, skipped = [], []
+    for quiz in report["quizzes"]:
+        if quiz["errors"] or not quiz["questions"]:
+            skipped.append({"title": quiz["title"], "error_count": len(quiz["errors"])})
+            continue
+        try:
+            new_quiz = save_imported_quiz(db, user_id, quiz["title"], quiz["questions"],
+                                          description="Excel (toplu) ile oluşturuldu")
+            created.append({"title": quiz["title"], "quiz_id": new_quiz.id, "questions_count": len(quiz["questions"])})
+        except Exception as e:
+            print(f"Bulk Import Error ({quiz['title']}): {e}")
+            skipped.append({"title": quiz["title"], "error_count": 1})
+            report["errors"].append({"sheet": None, "row": None, "error": f"{quiz['title']}: {str(e)}"})
+    return {"created": created, "skipped": skipped}
+
+@router.post("/bulk")
+async def bulk_import(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    """
+    Imports a question bank: every sheet (or every value of the optional
+    'Yarışma' column) becomes its own quiz. All rows are validated first;
+    quizzes with invalid rows are skipped and reported per row.
+    """
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Sadece .xlsx dosyaları kabul edilir.")
+
+    if not current_user: raise HTTPException(status_code=401, detail="Not authenticated")
+
+    started = time.perf_counter()
+    path = await run_in_threadpool(spool_upload, file, MAX_BULK_BYTES)
+    try:
+        report = await job_pool.run(parse_workbook, path, MAX_BULK_ROWS, timeout=BULK_TIMEOUT)
+    except ExcelFormatError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Dosya işleme zaman aşımına uğradı.")
+    except Exception as e:
+        print(f"Bulk Parse Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Dosya okunamadı: {str(e)}")
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    result = await run_in_threadpool(save_bulk_import, db, current_user.id, report)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "created": result["created"],
+        "skipped": result["skipped"],
+        "errors": report["errors"],
+        "rows": report["rows"],
+        "elapsed_ms": round(elapsed * 1000),
+        "rows_per_second": round(report["rows"] / elapsed) if elapsed > 0 else None
+    }
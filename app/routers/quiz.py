@@ -1,22 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
 from typing import List
 from .. import models, schemas
 from ..database import get_db
-from ..database import get_db
 from app.core.templates import templates
+from app.core.auth import CachedUser, get_current_user
+from app.core.quiz_cache import quiz_cache, current_revision, etag_matches, quiz_etag
+from app.analytics import clear_question_stats
+from app.quiz_store import has_document, questions_from_document, sync_document, use_documents
 
 router = APIRouter()
 # templates = Jinja2Templates(directory="app/templates") -> REMOVED
 
 @router.post("/quizzes/", response_model=schemas.Quiz)
-def create_quiz(quiz: schemas.QuizCreate, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
-    if not user: raise HTTPException(status_code=401, detail="User not found")
+def create_quiz(quiz: schemas.QuizCreate, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
 
     db_quiz = models.Quiz(
         title=quiz.title, 
@@ -51,6 +50,9 @@ def create_quiz(quiz: schemas.QuizCreate, request: Request, db: Session = Depend
         db.commit() # Commit options
         
     db.refresh(db_quiz)
+    sync_document(db_quiz)
+    db.commit()
+    quiz_cache.invalidate(db_quiz.id)
     return db_quiz
 
 @router.get("/quizzes/", response_model=List[schemas.Quiz])
@@ -59,11 +61,26 @@ def read_quizzes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db))
     return quizzes
 
 @router.get("/quizzes/{quiz_id}", response_model=schemas.Quiz)
-def read_quiz(quiz_id: int, db: Session = Depends(get_db)):
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
-    if quiz is None:
+def read_quiz(quiz_id: int, request: Request, db: Session = Depends(get_db)):
+    # Conditional request: the ETag only depends on the DB revision, so a
+    # one-column lookup is enough to answer 304 (and it's the same on every worker)
+    revision = current_revision(db, quiz_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    etag = quiz_etag(quiz_id, revision)
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        quiz_cache.record_not_modified()
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    doc = quiz_cache.get(db, quiz_id, revision)
+    if doc is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    return quiz
+
+    return Response(
+        content=doc.api_json,
+        media_type="application/json",
+        headers={"ETag": doc.etag, "Cache-Control": "no-cache"}
+    )
 
 def check_auth(request: Request):
     user = request.cookies.get("user_session")
@@ -78,12 +95,10 @@ async def create_quiz_page(request: Request):
     return templates.TemplateResponse("create_quiz.html", {"request": request, "title": "BiSual - Yarışma Oluştur"})
 
 @router.get("/host", response_class=HTMLResponse)
-async def host_list_page(request: Request, db: Session = Depends(get_db)):
+def host_list_page(request: Request, db: Session = Depends(get_db), user_obj: CachedUser = Depends(get_current_user)):
     try:
-        user = request.cookies.get("user_session")
-        if not user: return RedirectResponse("/login")
+        if not request.cookies.get("user_session"): return RedirectResponse("/login")
         
-        user_obj = db.query(models.User).filter(models.User.username == user).first()
         if not user_obj:
             response = RedirectResponse("/login")
             response.delete_cookie("user_session")
@@ -136,53 +151,33 @@ async def host_lobby_page(request: Request, quiz_id: int):
         "port": port
     })
 @router.get("/quizzes/{quiz_id}/edit", response_class=HTMLResponse)
-async def edit_quiz_page(request: Request, quiz_id: int, db: Session = Depends(get_db)):
-    user = request.cookies.get("user_session")
-    if not user: return RedirectResponse("/login")
+def edit_quiz_page(request: Request, quiz_id: int, db: Session = Depends(get_db), user_obj: CachedUser = Depends(get_current_user)):
+    if not user_obj: return RedirectResponse("/login")
     
-    user_obj = db.query(models.User).filter(models.User.username == user).first()
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user_obj.id).first()
+    # Serialized editor JSON comes pre-rendered from the quiz cache
+    doc = quiz_cache.get(db, quiz_id)
     
-    if not quiz:
+    if not doc or doc.user_id != user_obj.id:
         return RedirectResponse("/host")
-
-    # Serialize Quiz Data for Frontend
-    quiz_data = {
-        "id": quiz.id,
-        "title": quiz.title,
-        "description": quiz.description,
-        "theme": quiz.theme,
-        "settings": quiz.settings or {},
-        "questions": []
-    }
-    
-    for q in quiz.questions:
-        q_data = {
-            "text": q.text,
-            "time_limit": q.time_limit,
-            "points": q.points,
-            "question_type": q.question_type,
-            "image_url": q.image_url,
-            "options": [{"text": opt.text, "is_correct": opt.is_correct} for opt in q.options]
-        }
-        quiz_data["questions"].append(q_data)
         
     return templates.TemplateResponse("create_quiz.html", {
         "request": request, 
-        "title": f"Düzenle: {quiz.title}",
-        "quiz_json": quiz_data
+        "title": f"Düzenle: {doc.title}",
+        "quiz_json": doc.editor_json
     })
 
 @router.put("/quizzes/{quiz_id}", response_model=schemas.Quiz)
-async def update_quiz(quiz_id: int, quiz_update: schemas.QuizCreate, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: raise HTTPException(status_code=401, detail="Not authenticated")
+def update_quiz(quiz_id: int, quiz_update: schemas.QuizCreate, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
     
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
     db_quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user.id).first()
     
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
+
+    # The editor sends the revision it was loaded from; refuse to overwrite newer edits
+    if quiz_update.revision is not None and quiz_update.revision != (db_quiz.document_version or 0):
+        raise HTTPException(status_code=409, detail="Bu yarışma başka bir yerde güncellendi. Lütfen sayfayı yenileyip tekrar deneyin.")
         
     # Update Basic Info
     db_quiz.title = quiz_update.title
@@ -228,14 +223,15 @@ async def update_quiz(quiz_id: int, quiz_update: schemas.QuizCreate, request: Re
             db.add(db_option)
         db.commit()
         
+    sync_document(db_quiz)
+    # Item statistics of the replaced questions no longer apply
+    clear_question_stats(db, db_quiz.id, before_revision=db_quiz.revision)
+    db.commit()
+    quiz_cache.invalidate(db_quiz.id)
     return db_quiz
 
 @router.post("/quizzes/duplicate/{quiz_id}")
-async def duplicate_quiz(quiz_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
-    
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
+def duplicate_quiz(quiz_id: int, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
     if not user: return RedirectResponse("/login")
     
     original_quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user.id).first()
@@ -250,46 +246,54 @@ async def duplicate_quiz(quiz_id: int, request: Request, db: Session = Depends(g
         settings=original_quiz.settings,
         user_id=user.id
     )
-    db.add(new_quiz)
-    db.commit()
-    db.refresh(new_quiz)
-    
-    # 2. Copy Questions & Options
-    for q in original_quiz.questions:
-        new_q = models.Question(
-            quiz_id=new_quiz.id,
-            text=q.text,
-            time_limit=q.time_limit,
-            points=q.points,
-            question_type=q.question_type,
-            image_url=q.image_url
-        )
-        db.add(new_q)
+
+    if use_documents() and has_document(original_quiz):
+        # Copy straight from the source document, everything in one transaction
+        new_quiz.questions = questions_from_document(original_quiz.document)
+        db.add(new_quiz)
+        db.flush()
+    else:
+        db.add(new_quiz)
         db.commit()
-        db.refresh(new_q)
+        db.refresh(new_quiz)
         
-        for opt in q.options:
-            new_opt = models.Option(
-                question_id=new_q.id,
-                text=opt.text,
-                is_correct=opt.is_correct
+        # 2. Copy Questions & Options
+        for q in original_quiz.questions:
+            new_q = models.Question(
+                quiz_id=new_quiz.id,
+                text=q.text,
+                time_limit=q.time_limit,
+                points=q.points,
+                question_type=q.question_type,
+                image_url=q.image_url
             )
-            db.add(new_opt)
-        db.commit()
+            db.add(new_q)
+            db.commit()
+            db.refresh(new_q)
+            
+            for opt in q.options:
+                new_opt = models.Option(
+                    question_id=new_q.id,
+                    text=opt.text,
+                    is_correct=opt.is_correct
+                )
+                db.add(new_opt)
+            db.commit()
         
+    sync_document(new_quiz)
+    db.commit()
+    quiz_cache.invalidate(new_quiz.id)
     return RedirectResponse(url="/host", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/quizzes/delete/{quiz_id}")
-async def delete_quiz(quiz_id: int, request: Request, db: Session = Depends(get_db)):
-    user_cookie = request.cookies.get("user_session")
-    if not user_cookie: return RedirectResponse("/login")
-    
-    user = db.query(models.User).filter(models.User.username == user_cookie).first()
+def delete_quiz(quiz_id: int, db: Session = Depends(get_db), user: CachedUser = Depends(get_current_user)):
     if not user: return RedirectResponse("/login")
     
     quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id, models.Quiz.user_id == user.id).first()
     if quiz:
         db.delete(quiz)
+        clear_question_stats(db, quiz_id)
         db.commit()
+        quiz_cache.invalidate(quiz_id)
         
     return RedirectResponse(url="/host", status_code=status.HTTP_303_SEE_OTHER)
@@ -56,9 +56,11 @@ class QuizBase(BaseModel):
 
 class QuizCreate(QuizBase):
     questions: List[QuestionCreate]
+    revision: Optional[int] = None  # Revision the editor started from (PUT conflict check)
 
 class Quiz(QuizBase):
     id: int
+    revision: int = 0
     questions: List[Question]
     class Config:
         orm_mode = True
@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import urllib.request
+
+# Usage:
+#   python build_assets.py            (vendor third-party libraries + fingerprint/compress app/static)
+#   python build_assets.py --offline  (only fingerprint/compress what is already in app/static)
+#
+# Output (all inside app/static, picked up by app/core/static.py):
+#   vendor/*                 local copies of Alpine, confetti, QRCode and Tailwind
+#   <name>.<hash>.<ext>      fingerprinted copies, served with immutable caching
+#   *.gz / *.br              precompressed siblings (.br needs the 'brotli' package)
+#   manifest.json            original path -> fingerprinted path
+
+STATIC_DIR = os.path.join("app", "static")
+VENDOR_DIR = os.path.join(STATIC_DIR, "vendor")
+MANIFEST = os.path.join(STATIC_DIR, "manifest.json")
+HASH_LENGTH = 12
+COMPRESSIBLE = (".js", ".css", ".svg", ".json", ".html", ".txt")
+SKIP_DIRS = {"uploads"}
+
+VENDOR_DOWNLOADS = {
+    "alpine.min.js": "https://cdn.jsdelivr.net/npm/alpinejs@3.13.3/dist/cdn.min.js",
+    "confetti.browser.min.js": "https://cdn.jsdelivr.net/npm/canvas-confetti@1.9.2/dist/confetti.browser.min.js",
+    "qrcode.min.js": "https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js",
+    # Fallback when the Tailwind CLI is not installed: the browser runtime, served locally
+    "tailwindcss.js": "https://cdn.tailwindcss.com",
+}
+
+# Superset of the inline tailwind.config blocks in the templates
+TAILWIND_CONFIG = """module.exports = {
+  content: ["./app/templates/**/*.html"],
+  darkMode: 'class',
+  theme: {
+    extend: {
+      fontFamily: { sans: ['Outfit', 'sans-serif'] },
+      colors: {
+        brand: {
+          50: '#eef2ff', 100: '#e0e7ff', 200: '#c7d2fe', 300: '#a5b4fc', 400: '#818cf8',
+          500: '#6366f1', 600: '#4f46e5', 700: '#4338ca', 800: '#3730a3', 900: '#312e81',
+        }
+      },
+      animation: { 'float': 'float 6s ease-in-out infinite' },
+      keyframes: {
+        float: { '0%, 100%': { transform: 'translateY(0)' }, '50%': { transform: 'translateY(-10px)' } }
+      }
+    }
+  }
+}
+"""
+
+def vendor():
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    for name, url in VENDOR_DOWNLOADS.items():
+        print(f"Downloading {url} ...")
+        with urllib.request.urlopen(url, timeout=60) as response:
+            data = response.read()
+        with open(os.path.join(VENDOR_DIR, name), "wb") as f:
+            f.write(data)
+
+    # Compiled, minified CSS instead of the in-browser JIT compiler
+    cli = os.getenv("TAILWIND_CLI") or shutil.which("tailwindcss")
+    if not cli:
+        print("Tailwind CLI not found: pages will use the vendored Tailwind runtime.")
+        return
+    config_path = os.path.join(VENDOR_DIR, "tailwind.config.js")
+    input_path = os.path.join(VENDOR_DIR, "tailwind.input.css")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(TAILWIND_CONFIG)
+    with open(input_path, "w", encoding="utf-8") as f:
+        f.write("@tailwind base;\n@tailwind components;\n@tailwind utilities;\n")
+    try:
+        subprocess.run([cli, "-c", config_path, "-i", input_path,
+                        "-o", os.path.join(VENDOR_DIR, "tailwind.css"), "--minify"], check=True)
+    finally:
+        os.remove(config_path)
+        os.remove(input_path)
+
+def is_generated(name: str, previous: set) -> bool:
+    return name.endswith((".gz", ".br")) or name == "manifest.json" or name in previous
+
+def compress(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    with gzip.open(path + ".gz", "wb", compresslevel=9) as f:
+        f.write(data)
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + ".br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+def fingerprint():
+    # Remove outputs of the previous run first
+    previous = {}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, encoding="utf-8") as f:
+            previous = json.load(f)
+    for hashed in previous.values():
+        for suffix in ("", ".gz", ".br"):
+            path = os.path.join(STATIC_DIR, hashed + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            if is_generated(rel, set(previous.values())) or name.startswith("."):
+                continue
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{stem}.{digest}{ext}"
+            shutil.copyfile(path, os.path.join(STATIC_DIR, hashed))
+            manifest[rel] = hashed
+
+            if ext in COMPRESSIBLE:
+                compress(path)
+                compress(os.path.join(STATIC_DIR, hashed))
+
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Fingerprinted {len(manifest)} files -> {MANIFEST}")
+
+if __name__ == "__main__":
+    if not os.path.exists("main.py"):
+        print("Error: Please run this script from the project root directory (where main.py is).")
+        sys.exit(1)
+    if "--offline" not in sys.argv:
+        vendor()
+    fingerprint()
@@ -13,6 +13,11 @@ if os.path.exists("dist"): shutil.rmtree("dist")
 
 print("🚀 Starting Build Process for BiSual...")
 
+# Vendored libraries + fingerprinted/precompressed static files (the exe serves them locally)
+import build_assets
+build_assets.vendor()
+build_assets.fingerprint()
+
 PyInstaller.__main__.run([
     'main.py',
     '--name=BiSual',
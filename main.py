@@ -1,21 +1,18 @@
-from fastapi import FastAPI, Request, UploadFile, File
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse
 from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 from app.database import engine, SessionLocal
-from app.routers import quiz, game, auth, import_quiz, ai_quiz
+from app.routers import quiz, game, auth, import_quiz, export_quiz, ai_quiz, analytics
 from app.core.csrf import CSRFMiddleware, get_csrf_token, validate_csrf
+from app.core.auth import CachedUser, get_current_user
 from app import models
-import shutil
-import uuid
 import sys
 import os
-from dotenv import load_dotenv
 from fastapi import Depends
 
-load_dotenv()
-
 app = FastAPI(
     title="BiSual - Interactive Quiz Platform"
 )
@@ -23,7 +20,12 @@ app = FastAPI(
 # Add CSRF Middleware (Cookie Setter)
 app.add_middleware(CSRFMiddleware)
 
+# gzip/brotli for HTML and JSON responses (outermost, so it also sees the CSRF cookie headers)
+from app.core.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
 from app.core.templates import templates, resource_path
+from app.core.page_cache import page_cache
 
 # Helper for PyInstaller path - Imported from core.templates
 # def resource_path(relative_path): ...
@@ -39,9 +41,6 @@ async def debug_exception_handler(request: Request, exc: Exception):
         content={"message": "Internal Server Error", "detail": str(exc), "trace": error_details.split('\n')},
     )
 
-# Create DB tables
-models.Base.metadata.create_all(bind=engine)
-
 from sqlalchemy import inspect
 
 # Auto-Migrate (Support both SQLite and Postgres)
@@ -58,18 +57,100 @@ def run_migrations():
                     # Generic SQL that works for both (Postgres supports JSON, SQLite supports it as affinity)
                     conn.execute(text("ALTER TABLE quizzes ADD COLUMN settings JSON DEFAULT '{}'"))
                 print("Migration successful.")
+
+            # Denormalized document storage columns (see app/quiz_store.py)
+            if 'document' not in columns:
+                print("Migrating DB: Adding document columns...")
+                with engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE quizzes ADD COLUMN document JSON"))
+                    conn.execute(text("ALTER TABLE quizzes ADD COLUMN document_version INTEGER DEFAULT 0"))
+                print("Migration successful.")
+
+        # Analytics keyed by quiz revision (see app/analytics.py). Existing rows are
+        # attributed to the quiz's current revision, as the report assumed before.
+        for table in ("games", "question_stats"):
+            if inspector.has_table(table) and 'quiz_revision' not in [col['name'] for col in inspector.get_columns(table)]:
+                print(f"Migrating DB: Adding quiz_revision to {table}...")
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN quiz_revision INTEGER DEFAULT 0"))
+                    conn.execute(text(
+                        f"UPDATE {table} SET quiz_revision = "
+                        f"(SELECT COALESCE(document_version, 0) FROM quizzes WHERE quizzes.id = {table}.quiz_id)"
+                    ))
+                print("Migration successful.")
+        # Games remember the quiz owner, so a teacher's trends survive deleting the quiz
+        if inspector.has_table("games") and 'user_id' not in [col['name'] for col in inspector.get_columns("games")]:
+            print("Migrating DB: Adding user_id to games...")
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE games ADD COLUMN user_id INTEGER"))
+                conn.execute(text("UPDATE games SET user_id = (SELECT user_id FROM quizzes WHERE quizzes.id = games.quiz_id)"))
+            print("Migration successful.")
+        return True
     except Exception as e:
         print(f"Migration Init Warning: {e}")
         import traceback
         traceback.print_exc()
+        return False
+
+# Bump when models or run_migrations() change; the next startup then runs the full schema setup once
+SCHEMA_VERSION = 3
+
+def stored_schema_version():
+    """One-row lookup instead of inspecting every table on each cold start."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_info")).scalar()
+    except Exception:
+        return None
+
+def setup_schema():
+    if stored_schema_version() == SCHEMA_VERSION:
+        return
+    print(f"Setting up DB schema (version {SCHEMA_VERSION})...")
+    models.Base.metadata.create_all(bind=engine)
+    if not run_migrations():
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_info (version INTEGER NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_info"))
+        conn.execute(text("INSERT INTO schema_info (version) VALUES (:version)"), {"version": SCHEMA_VERSION})
 
-run_migrations()
+# Registered first: the other startup handlers expect the tables to exist
+@app.on_event("startup")
+def init_db():
+    setup_schema()
 
 # Version Check Route
 @app.get("/version")
 def get_version():
     return {"version": "1.0.0"}
 
+# Runtime Metrics (cache hit rates etc.)
+@app.get("/metrics")
+def get_metrics(user: CachedUser = Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401, detail="Not authenticated")
+    if user.role != 'super_admin':
+        raise HTTPException(status_code=403, detail="Bu sayfa sadece yöneticiler içindir.")
+    from app.core.ai import ai_gateway
+    from app.core.ai_cache import ai_cache
+    from app.core.auth import user_cache
+    from app.core.compression import response_stats
+    from app.core.quiz_cache import quiz_cache
+    from app.core.workers import job_pool
+    from app.core.templates import render_stats
+    from app.results_writer import results_writer
+    return {
+        "user_cache": user_cache.stats(),
+        "quiz_cache": quiz_cache.stats(),
+        "job_pool": job_pool.stats(),
+        "results_writer": results_writer.stats(),
+        "ai": ai_gateway.stats(),
+        "ai_cache": ai_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "templates": render_stats.stats(),
+        "responses": response_stats.stats(),
+    }
+
 # Manual Fix Route
 @app.get("/fix-db")
 def manual_fix_db():
@@ -80,25 +161,26 @@ def manual_fix_db():
         return {"status": "error", "message": str(e)}
 
 # Mount bundled static files (CSS, JS, Audio) - Read Only
-app.mount("/static", StaticFiles(directory=resource_path("app/static")), name="static")
+# Precompressed + long-lived caching for fingerprinted files (see build_assets.py)
+from app.core.static import CachedStaticFiles
+app.mount("/static", CachedStaticFiles(directory=resource_path("app/static")), name="static")
 
 # Mount Uploads directory - Writable (Next to EXE or /tmp for Vercel)
 # We ensure the folder exists
-if os.environ.get("VERCEL"):
-    UPLOAD_DIR = "/tmp/uploads"
-else:
-    UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+from app.core.uploads import UPLOAD_DIR, UploadFiles, UploadError, store_image, schedule_variants
 
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.mount("/uploads", UploadFiles(directory=UPLOAD_DIR), name="uploads")
 
 # Include Routers
 app.include_router(auth.router, tags=["auth"])
 app.include_router(quiz.router, prefix="/api", tags=["quiz"])
 app.include_router(import_quiz.router, prefix="/api", tags=["import"])
+app.include_router(export_quiz.router, prefix="/api", tags=["export"])
 app.include_router(ai_quiz.router, prefix="/api", tags=["ai"])
+app.include_router(analytics.router, prefix="/api", tags=["analytics"])
 app.include_router(quiz.router, tags=["quiz_ui"])
 app.include_router(game.router, tags=["game"])
 
@@ -112,6 +194,39 @@ def create_initial_user():
         db.commit()
     db.close()
 
+# Worker pool for CPU-bound jobs (Excel import/export)
+@app.on_event("startup")
+def start_job_pool():
+    from app.core.workers import job_pool
+    job_pool.start()
+
+@app.on_event("shutdown")
+def stop_job_pool():
+    from app.core.workers import job_pool
+    job_pool.shutdown()
+
+# Write-behind queue for game results
+@app.on_event("startup")
+async def start_results_writer():
+    from app.results_writer import results_writer
+    results_writer.start()
+
+@app.on_event("shutdown")
+async def stop_results_writer():
+    from app.results_writer import results_writer
+    await results_writer.stop()
+
+# Background refresh of the AI model availability list
+@app.on_event("startup")
+async def start_ai_gateway():
+    from app.core.ai import ai_gateway
+    ai_gateway.start()
+
+@app.on_event("shutdown")
+async def stop_ai_gateway():
+    from app.core.ai import ai_gateway
+    await ai_gateway.stop()
+
 # Templates
 # templates = Jinja2Templates(...) -> Imported from app.core.templates
 
@@ -121,17 +236,17 @@ def create_initial_user():
 
 @app.post("/upload")
 async def upload_image(file: UploadFile = File(...)):
-    # Create valid filename
-    file_ext = file.filename.split('.')[-1]
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    
-    # Save to external 'uploads' folder (writable path)
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
+    # Chunked copy + hashing runs in the threadpool; the name is the content hash,
+    # so identical images are stored once and the URL never changes meaning
+    try:
+        filename = await run_in_threadpool(store_image, file.file)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        await file.close()
+
+    # Downscaled variants for phones/projector are built in the background
+    schedule_variants(filename)
     return {"url": f"/uploads/{filename}"}
 
 @app.get("/", response_class=HTMLResponse)
@@ -139,8 +254,11 @@ async def read_root(request: Request, pin: str = None):
     if pin:
         from fastapi.responses import RedirectResponse
         return RedirectResponse(url=f"/play?pin={pin}")
-    return templates.TemplateResponse("index.html", {"request": request, "title": "BiSual Home"})
+    return page_cache.render(request, "index.html", {"title": "BiSual Home"})
 
 if __name__ == "__main__":
+    # Required for the process pool in the PyInstaller exe (spawned workers re-run the exe)
+    import multiprocessing
+    multiprocessing.freeze_support()
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
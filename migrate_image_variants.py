@@ -0,0 +1,35 @@
+import os
+from app.core.images import IMAGE_VARIANTS_ENABLED, IMAGE_VARIANT_WIDTHS, build_variants
+from app.core.uploads import UPLOAD_DIR, is_original_image
+
+# Usage:
+#   python migrate_image_variants.py
+#
+# Builds the downscaled WebP variants for every image already in the uploads
+# folder (including UUID-named uploads from before content addressing), so the
+# first game using them doesn't have to fall back to the full-size originals.
+# Existing variants are skipped; safe to run again.
+
+def backfill():
+    if not IMAGE_VARIANTS_ENABLED:
+        print("Image variants are disabled (IMAGE_VARIANTS_ENABLED=false or Pillow is not installed).")
+        return
+    if not os.path.isdir(UPLOAD_DIR):
+        print(f"No uploads folder at {UPLOAD_DIR}.")
+        return
+
+    widths = sorted(set(IMAGE_VARIANT_WIDTHS.values()))
+    built, failed = 0, 0
+    for filename in sorted(os.listdir(UPLOAD_DIR)):
+        if not is_original_image(filename):
+            continue
+        try:
+            written = build_variants(UPLOAD_DIR, filename, widths)
+            built += len(written)
+        except Exception as e:
+            failed += 1
+            print(f"Skipping {filename}: {e}")
+    print(f"Wrote {built} variants ({failed} images could not be read).")
+
+if __name__ == "__main__":
+    backfill()
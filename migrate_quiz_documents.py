@@ -0,0 +1,69 @@
+import sys
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app import models
+from app.quiz_store import build_document, has_document, questions_from_document
+
+# Usage:
+#   python migrate_quiz_documents.py to-documents   (backfill Quiz.document from the tables)
+#   python migrate_quiz_documents.py to-normalized  (rebuild the tables from Quiz.document, then drop documents)
+
+def ensure_columns():
+    columns = [col['name'] for col in inspect(engine).get_columns("quizzes")]
+    with engine.begin() as conn:
+        if 'document' not in columns:
+            print("Adding 'document' column to 'quizzes' table...")
+            conn.execute(text("ALTER TABLE quizzes ADD COLUMN document JSON"))
+        if 'document_version' not in columns:
+            print("Adding 'document_version' column to 'quizzes' table...")
+            conn.execute(text("ALTER TABLE quizzes ADD COLUMN document_version INTEGER DEFAULT 0"))
+
+def to_documents():
+    ensure_columns()
+    db = SessionLocal()
+    try:
+        count = 0
+        for quiz in db.query(models.Quiz).all():
+            quiz.document = build_document(quiz)
+            quiz.document_version = (quiz.document_version or 0) + 1
+            count += 1
+        db.commit()
+        print(f"Stored documents for {count} quizzes.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+    finally:
+        db.close()
+
+def to_normalized():
+    ensure_columns()
+    db = SessionLocal()
+    try:
+        count = 0
+        for quiz in db.query(models.Quiz).all():
+            if has_document(quiz):
+                # Documents are the newer copy: replace rows, keeping the original ids
+                for question in list(quiz.questions):
+                    db.delete(question)
+                db.flush()
+                quiz.questions = questions_from_document(quiz.document, keep_ids=True)
+                count += 1
+            quiz.document = None
+            # New revision: running servers drop their cached copies on the next read
+            quiz.document_version = (quiz.document_version or 0) + 1
+        db.commit()
+        print(f"Rebuilt questions/options for {count} quizzes, documents cleared.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    direction = sys.argv[1] if len(sys.argv) > 1 else ""
+    if direction == "to-documents":
+        to_documents()
+    elif direction == "to-normalized":
+        to_normalized()
+    else:
+        print("Usage: python migrate_quiz_documents.py [to-documents|to-normalized]")
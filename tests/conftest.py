@@ -0,0 +1,194 @@
+import os
+import tempfile
+
+# Settings are read once at import time, so they are set before the app is imported:
+# a throwaway SQLite file, the thread job pool (no worker processes) and a
+# dummy Gemini key (the AI backend is replaced by a stub in the tests).
+TEST_DIR = tempfile.mkdtemp(prefix="bisual-tests-")
+os.environ["DATABASE_URL"] = ""  # empty, not unset: load_dotenv() must not bring in a real database
+os.environ["SQLITE_DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DIR, "test.db")
+os.environ["TEMPLATE_BYTECODE_DIR"] = os.path.join(TEST_DIR, "jinja")
+os.environ["JOB_POOL_MODE"] = "thread"
+os.environ["GEMINI_API_KEY"] = "test-key"
+
+from contextlib import ExitStack
+import asyncio
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app import models
+from app.core.ai import MODELS, ai_gateway
+from app.database import SessionLocal
+
+STUB_REPLY = json.dumps({
+    "title": "Tarih Yarışması",
+    "description": "Test",
+    "questions": [
+        {
+            "text": f"Tarih sorusu {i + 1}?",
+            "limit": 20,
+            "points": 1000,
+            "options": [
+                {"text": "A", "is_correct": i % 4 == 0},
+                {"text": "B", "is_correct": i % 4 == 1},
+                {"text": "C", "is_correct": i % 4 == 2},
+                {"text": "D", "is_correct": i % 4 == 3},
+            ],
+        }
+        for i in range(2)
+    ],
+}, ensure_ascii=False)
+
+class StubBackend:
+    """Local stand-in for Gemini: a canned reply, optional delay and models that always fail.
+
+    `reply` may also be a callable taking the prompt, for replies that depend on it.
+    """
+    def __init__(self, reply: str = STUB_REPLY, delay: float = 0.0, failing=()):
+        self.reply = reply
+        self.delay = delay
+        self.failing = set(failing)
+        self.calls = []  # model names, in call order
+        self.prompts = []
+        self.finished = 0
+
+    def reply_for(self, prompt: str) -> str:
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+    async def generate(self, model_name: str, prompt: str) -> str:
+        self.calls.append(model_name)
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if model_name in self.failing:
+            raise RuntimeError(f"{model_name} unavailable")
+        self.finished += 1
+        return self.reply_for(prompt)
+
+    async def stream(self, model_name: str, prompt: str):
+        self.calls.append(model_name)
+        self.prompts.append(prompt)
+        if model_name in self.failing:
+            raise RuntimeError(f"{model_name} unavailable")
+        # Small uneven chunks, wrapped in the markdown fence models like to add
+        text = "```json\n" + self.reply_for(prompt) + "\n```"
+        for i in range(0, len(text), 37):
+            await asyncio.sleep(self.delay)
+            yield text[i:i + 37]
+        self.finished += 1
+
+    async def list_models(self) -> list:
+        return [f"models/{name}" for name in MODELS]
+
+@pytest.fixture(scope="session")
+def client():
+    # One client (and event loop) for the whole run: the job pool, results
+    # writer and AI gateway are module-level singletons started on startup.
+    # The real Gemini backend is never used, not even for the model list refresh.
+    ai_gateway.backend = StubBackend()
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def stub(client, monkeypatch):
+    """Fresh stub backend and circuit breakers for one test."""
+    backend = StubBackend()
+    monkeypatch.setattr(ai_gateway, "backend", backend)
+    monkeypatch.setattr(ai_gateway, "breakers", {})
+    return backend
+
+@pytest.fixture
+def admin(client):
+    """Logs the test client in as the default admin (created on startup)."""
+    client.cookies.set("user_session", "admin")
+    yield client
+    client.cookies.clear()
+
+def sample_quiz(title: str = "Test Yarışması", questions: int = 2) -> dict:
+    return {
+        "title": title,
+        "questions": [
+            {
+                "text": f"Soru {i + 1}",
+                "time_limit": 20,
+                "points": 1000,
+                "options": [
+                    {"text": "Doğru", "is_correct": True},
+                    {"text": "Yanlış 1", "is_correct": False},
+                    {"text": "Yanlış 2", "is_correct": False},
+                    {"text": "Yanlış 3", "is_correct": False},
+                ],
+            }
+            for i in range(questions)
+        ],
+    }
+
+@pytest.fixture
+def quiz_id(admin):
+    response = admin.post("/api/quizzes/", json=sample_quiz())
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def start_game(client, stack: ExitStack, quiz_id: int, nicknames: list):
+    """Opens the host socket and one socket per player (closed with `stack`); returns (host, pin, players)."""
+    host = stack.enter_context(client.websocket_connect(f"/ws/host/{quiz_id}"))
+    created = host.receive_json()
+    assert created["type"] == "GAME_CREATED"
+    pin = created["pin"]
+
+    players = []
+    for nickname in nicknames:
+        player = stack.enter_context(client.websocket_connect(f"/ws/player/{pin}/{nickname}"))
+        assert host.receive_json()["type"] == "PLAYER_JOINED"
+        assert player.receive_json()["type"] == "GAME_JOINED"
+        players.append(player)
+    return host, pin, players
+
+def receive_until(ws, *types) -> dict:
+    """Skips messages until one of `types` arrives (leaderboards, answer counts, ...)."""
+    while True:
+        message = ws.receive_json()
+        if message["type"] in types:
+            return message
+
+def play_game(client, quiz_id: int, answers: dict) -> str:
+    """Plays a whole game and returns its PIN once GAME_OVER was sent.
+
+    answers[nickname][i] is the option text that player picks for question i
+    (None: no answer). Everyone answers with the full time left.
+    """
+    with ExitStack() as stack:
+        host, pin, players = start_game(client, stack, quiz_id, list(answers))
+        sockets = dict(zip(answers, players))
+        host.send_json({"type": "START_GAME"})
+        index = 0
+        while True:
+            message = receive_until(host, "NEW_QUESTION", "GAME_OVER")
+            if message["type"] == "GAME_OVER":
+                return pin
+            question = message["question"]
+            texts = [o["text"] for o in question["options"]]
+            for nickname, ws in sockets.items():
+                receive_until(ws, "NEW_QUESTION")
+                choice = answers[nickname][index]
+                if choice is not None:
+                    ws.send_json({"type": "SUBMIT_ANSWER", "answer": texts.index(choice), "time_left": question["time"]})
+                    receive_until(ws, "FEEDBACK")
+            host.send_json({"type": "NEXT_QUESTION"})
+            index += 1
+
+def wait_for_game(pin: str, timeout: float = 5.0) -> models.GameRecord:
+    """Waits until the write-behind results of the game with this PIN are committed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db = SessionLocal()
+        try:
+            game = (db.query(models.GameRecord).filter(models.GameRecord.pin == pin)
+                    .order_by(models.GameRecord.id.desc()).first())
+            if game is not None and game.ended_at is not None:
+                return game
+        finally:
+            db.close()
+        time.sleep(0.05)
+    raise AssertionError(f"results of game {pin} were not written")
@@ -0,0 +1,216 @@
+from contextlib import ExitStack
+import asyncio
+import json
+import re
+import threading
+import time
+import pytest
+from app.core.ai import MODELS, AIError, AIGateway, CircuitBreaker, QuestionStreamParser
+from app.core.ai_cache import ai_cache
+from app.routers import ai_quiz
+from app.routers.ai_quiz import preview_cache_key, preview_request
+from conftest import STUB_REPLY, StubBackend, start_game
+
+def sse_events(body: str) -> list:
+    """[(event, data)] from a text/event-stream body."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_preview_uses_gateway(admin, stub):
+    response = admin.post("/api/ai/preview", json={"topic": "Tarih", "count": 2, "fresh": True})
+    assert response.status_code == 200, response.text
+    assert response.headers["X-AI-Cache"] == "MISS"
+    assert [q["text"] for q in response.json()] == ["Tarih sorusu 1?", "Tarih sorusu 2?"]
+    assert stub.calls == [MODELS[0]]
+
+def test_preview_falls_back_to_next_model(admin, stub):
+    stub.failing = {MODELS[0]}
+    response = admin.post("/api/ai/preview", json={"topic": "Tarih", "count": 2, "fresh": True})
+    assert response.status_code == 200, response.text
+    assert stub.calls == MODELS[:2]
+
+def test_preview_all_models_failing(admin, stub):
+    stub.failing = set(MODELS)
+    response = admin.post("/api/ai/preview", json={"topic": "Tarih", "count": 2, "fresh": True})
+    assert response.status_code == 500
+    assert "Yapay zeka hatası" in response.json()["detail"]
+
+def test_preview_rejects_bad_numbers(admin, stub):
+    response = admin.post("/api/ai/preview", json={"topic": "Tarih", "time_limit": "abc"})
+    assert response.status_code == 400
+    assert stub.calls == []
+
+def test_preview_stream_events(admin, stub):
+    response = admin.post("/api/ai/preview/stream", json={"topic": "Tarih", "count": 2, "fresh": True})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    assert [name for name, _ in events] == ["question", "question", "done"]
+    assert events[0][1]["text"] == "Tarih sorusu 1?"
+    assert events[-1][1] == {"count": 2, "cached": False}
+
+def mixed_reply(count: int) -> dict:
+    """`count` usable questions with an unusable one (no correct option) up front."""
+    questions = json.loads(STUB_REPLY)["questions"] * count
+    broken = {"text": "Cevapsız?", "options": [{"text": "A", "is_correct": False}]}
+    return {"questions": [broken] + questions[:count]}
+
+def test_preview_caches_validated_questions(admin, stub):
+    stub.reply = json.dumps(mixed_reply(3))
+    body = {"topic": "Önbellek", "count": 2}
+    response = admin.post("/api/ai/preview", json=dict(body, fresh=True))
+    assert response.status_code == 200, response.text
+    assert [q["text"] for q in response.json()] == ["Tarih sorusu 1?", "Tarih sorusu 2?"]
+
+    # The streaming endpoint shares the cache key and serves the same questions
+    events = sse_events(admin.post("/api/ai/preview/stream", json=body).text)
+    assert [data["text"] for name, data in events if name == "question"] == ["Tarih sorusu 1?", "Tarih sorusu 2?"]
+    assert events[-1][1] == {"count": 2, "cached": True}
+    assert stub.calls == [MODELS[0]]
+
+def test_stream_validates_cached_entry(admin, stub):
+    """Entries stored raw by older code are validated and capped to count on the way out."""
+    body = {"topic": "Eski önbellek", "count": 1}
+    ai_cache.put(preview_cache_key(preview_request(body)), "preview", mixed_reply(2))
+    events = sse_events(admin.post("/api/ai/preview/stream", json=body).text)
+    assert [name for name, _ in events] == ["question", "done"]
+    assert events[0][1]["text"] == "Tarih sorusu 1?"
+    assert events[0][1]["question_type"] == "multiple_choice"
+    assert events[-1][1] == {"count": 1, "cached": True}
+    assert stub.calls == []
+
+def topic_reply(prompt: str) -> str:
+    """One valid question per "Question N Topic: X" line of a /generate prompt."""
+    return json.dumps({"title": "Konu Yarışması", "questions": [
+        {"text": f"{n}. {topic.strip()}?", "options": [{"text": "A", "is_correct": True}, {"text": "B", "is_correct": False}]}
+        for n, topic in re.findall(r"Question (\d+) Topic: (.+)", prompt)
+    ]}, ensure_ascii=False)
+
+def generated_questions(admin, response) -> list:
+    assert response.status_code == 200, response.text
+    return [q["text"] for q in admin.get(f"/api/quizzes/{response.json()['id']}").json()["questions"]]
+
+def test_generate_splits_topics_into_chunks(admin, stub, monkeypatch):
+    monkeypatch.setattr(ai_quiz, "AI_CHUNK_SIZE", 2)
+    stub.reply = topic_reply
+    topics = [f"Konu {i}" for i in range(1, 6)]
+    response = admin.post("/api/ai/generate", json={"topics": topics, "fresh": True})
+    assert sorted(prompt.count("Topic:") for prompt in stub.prompts) == [1, 2, 2]
+    assert sum('"title"' in prompt for prompt in stub.prompts) == 1  # only the first chunk names the quiz
+    # Chunks finish in any order; questions keep the topic order
+    assert generated_questions(admin, response) == [f"{i}. Konu {i}?" for i in range(1, 6)]
+
+def test_generate_retries_malformed_chunk(admin, stub):
+    one_question = json.dumps({"questions": json.loads(STUB_REPLY)["questions"][:1]})
+    replies = iter(["Üzgünüm, bu konuda yardımcı olamam.", one_question, STUB_REPLY])  # not JSON, too few, valid
+    stub.reply = lambda prompt: next(replies)
+    response = admin.post("/api/ai/generate", json={"topics": ["Tarih", "Tarih"], "fresh": True})
+    assert generated_questions(admin, response) == ["Tarih sorusu 1?", "Tarih sorusu 2?"]
+    assert stub.calls == [MODELS[0]] * 3  # retried on the same model: the call itself succeeded
+
+def test_generate_gives_up_after_retries(admin, stub, monkeypatch):
+    monkeypatch.setattr(ai_quiz, "AI_CHUNK_RETRIES", 1)
+    stub.reply = "Üzgünüm."
+    response = admin.post("/api/ai/generate", json={"topics": ["Tarih"], "fresh": True})
+    assert response.status_code == 500
+    assert "Soru 1-1" in response.json()["detail"]
+    assert len(stub.calls) == 2
+
+def test_generate_count_is_validated_and_clamped(admin, stub):
+    response = admin.post("/api/ai/generate", json={"topic": "Tarih", "count": "beş"})
+    assert response.status_code == 400
+    assert stub.calls == []
+
+    stub.reply = topic_reply
+    response = admin.post("/api/ai/generate", json={"topic": "Tarih", "count": "100", "fresh": True})
+    assert len(generated_questions(admin, response)) == ai_quiz.PREVIEW_MAX_QUESTIONS
+
+def test_stream_parser_handles_split_chunks():
+    parser = QuestionStreamParser()
+    found = []
+    for ch in "```json\n" + STUB_REPLY + "\n```":
+        found.extend(parser.feed(ch))
+    assert [q["text"] for q in found] == ["Tarih sorusu 1?", "Tarih sorusu 2?"]
+
+def test_gateway_timeout_counts_and_trips_breaker():
+    gateway = AIGateway(backend=StubBackend(delay=0.2), timeout=0.05)
+
+    async def calls():
+        for _ in range(3):
+            with pytest.raises(AIError):
+                await gateway.generate(MODELS[0], "prompt")
+
+    asyncio.run(calls())
+    assert gateway.stats()["timed_out"] == 3
+    assert gateway.breaker(MODELS[0]).state == "open"
+
+def test_circuit_breaker_probe_closes_again():
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_rate=0.5, cooldown=0)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert breaker.allow()  # cooldown over: one probe call
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # ... and only one
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+def test_games_keep_running_during_generation(client, admin, stub, quiz_id):
+    """A slow model call must not hold up question broadcasts of a live game."""
+    stub.delay = 1.0
+    result = {}
+    generation = threading.Thread(target=lambda: result.update(
+        response=admin.post("/api/ai/preview", json={"topic": "Tarih", "count": 2, "fresh": True})
+    ))
+
+    with ExitStack() as stack:
+        host, pin, players = start_game(client, stack, quiz_id, ["Oyuncu"])
+        generation.start()
+        deadline = time.monotonic() + 5
+        while not stub.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stub.calls, "generation never started"
+
+        host.send_json({"type": "START_GAME"})
+        assert host.receive_json()["type"] == "NEW_QUESTION"
+        assert players[0].receive_json()["type"] == "NEW_QUESTION"
+        assert stub.finished == 0  # the broadcast went out while the model was still "thinking"
+
+    generation.join()
+    assert result["response"].status_code == 200
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cancelled_queued_probe_releases_breaker(streaming):
+    """A half-open probe cancelled while waiting for a slot must not lock the model out."""
+    gateway = AIGateway(backend=StubBackend(delay=0.5), max_concurrent=1)
+    probed, busy = MODELS[0], MODELS[1]
+    breaker = gateway.breaker(probed)
+    breaker.cooldown = 0
+    breaker._open()
+
+    async def consume_stream():
+        async for _ in gateway.stream_with_fallback("prompt", models=[probed]):
+            pass
+
+    async def scenario():
+        holder = asyncio.create_task(gateway.generate(busy, "prompt"))  # takes the only slot
+        await asyncio.sleep(0.01)
+        probe = asyncio.create_task(
+            consume_stream() if streaming else gateway.generate_with_fallback("prompt", models=[probed])
+        )
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open" and breaker.probing
+        assert gateway.queued == 1
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        await holder
+
+    asyncio.run(scenario())
+    assert not breaker.probing
+    assert gateway.queued == 0
+    assert breaker.allow()  # the next request may probe again
@@ -0,0 +1,148 @@
+from datetime import datetime
+import uuid
+import pytest
+from app import models
+from app.analytics import clear_question_stats, question_report, update_question_stats
+from app.database import SessionLocal
+from app.quiz_store import quiz_questions
+from conftest import sample_quiz
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def quiz(admin, db):
+    response = admin.post("/api/quizzes/", json=sample_quiz("Analiz Yarışması"))
+    assert response.status_code == 200, response.text
+    return db.get(models.Quiz, response.json()["id"])
+
+def record_game(db, quiz, answers: dict, revision: int = None) -> int:
+    """Stores a finished game and folds it into question_stats.
+
+    `answers[nickname][i]` is (option_index, response_time) for question i, or None
+    if the player did not answer; option 0 is the correct one and is worth 1000 points.
+    """
+    game = models.GameRecord(uid=uuid.uuid4().hex, quiz_id=quiz.id, quiz_title=quiz.title, user_id=quiz.user_id,
+                             quiz_revision=quiz.revision if revision is None else revision, pin="000000",
+                             question_count=len(quiz_questions(quiz)), started_at=datetime.utcnow(),
+                             ended_at=datetime.utcnow(), finished=True)
+    db.add(game)
+    db.flush()
+    scores = {}
+    for nickname, picks in answers.items():
+        scores[nickname] = 0
+        for q_idx, pick in enumerate(picks):
+            if pick is None:
+                continue
+            option_index, response_time = pick
+            points = 1000 if option_index == 0 else 0
+            scores[nickname] += points
+            db.add(models.GameAnswer(game_id=game.id, question_index=q_idx, nickname=nickname, option_index=option_index,
+                                     is_correct=option_index == 0, points=points, response_time=response_time,
+                                     answered_at=datetime.utcnow()))
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    for rank, (nickname, score) in enumerate(ranked, 1):
+        db.add(models.GamePlayerResult(game_id=game.id, nickname=nickname, score=score, rank=rank))
+    db.flush()
+    update_question_stats(db, game.id)
+    db.commit()
+    return game.id
+
+# Four players: upper/lower 27% groups are one player each (A on top, D at the bottom)
+FIRST_GAME = {
+    "A": [(0, 2.0), (0, 3.0)],
+    "B": [(0, 4.0), (3, 5.0)],
+    "C": [(1, 6.0), (0, 1.0)],
+    "D": [(2, None), None],
+}
+
+def stats_by_question(db, quiz, revision=None) -> dict:
+    rows = db.query(models.QuestionStats).filter(
+        models.QuestionStats.quiz_id == quiz.id,
+        models.QuestionStats.quiz_revision == (quiz.revision if revision is None else revision)
+    ).all()
+    return {s.question_index: s for s in rows}
+
+def test_update_question_stats(db, quiz):
+    record_game(db, quiz, FIRST_GAME)
+    stats = stats_by_question(db, quiz)
+    q0, q1 = stats[0], stats[1]
+    assert (q0.games, q0.attempts, q0.correct) == (1, 4, 2)
+    assert (q0.response_time_sum, q0.response_time_count) == (12.0, 3)  # D's missing time is not averaged
+    assert q0.option_counts == {"0": 2, "1": 1, "2": 1}
+    assert (q0.upper_n, q0.upper_correct, q0.lower_n, q0.lower_correct) == (1, 1, 1, 0)
+    assert (q1.attempts, q1.correct) == (3, 2)  # D did not answer
+    assert q1.option_counts == {"0": 2, "3": 1}
+
+def test_item_report_math(db, quiz):
+    record_game(db, quiz, FIRST_GAME)
+    # Second game: F tops the table, E is at the bottom; only the first question is answered
+    record_game(db, quiz, {"E": [(1, 2.0), None], "F": [(0, 2.0), None]})
+    stats = stats_by_question(db, quiz)
+
+    q0 = question_report(stats[0])
+    assert q0["games"] == 2
+    assert q0["attempts"] == 6
+    assert q0["difficulty"] == 0.5
+    assert q0["discrimination"] == 1.0  # uppers (A, F) 2/2 correct, lowers (D, E) 0/2
+    assert q0["avg_response_time"] == 3.2  # (2 + 4 + 6 + 2 + 2) / 5
+    assert q0["option_rates"] == {"0": 0.5, "1": 0.333, "2": 0.167}
+
+    q1 = question_report(stats[1])
+    assert q1["games"] == 1
+    assert q1["difficulty"] == 0.667
+    assert q1["discrimination"] == 1.0
+    assert q1["avg_response_time"] == 3.0
+    assert q1["option_rates"] == {"0": 0.667, "3": 0.333}
+
+def test_discrimination_needs_two_players(db, quiz):
+    record_game(db, quiz, {"Yalnız": [(0, 1.0), (0, 1.0)]})
+    assert question_report(stats_by_question(db, quiz)[0])["discrimination"] is None
+
+def test_clear_question_stats_before_revision(db, quiz):
+    old, current = quiz.revision - 1, quiz.revision
+    record_game(db, quiz, FIRST_GAME, revision=old)
+    record_game(db, quiz, FIRST_GAME)
+
+    clear_question_stats(db, quiz.id, before_revision=current)
+    db.commit()
+    assert stats_by_question(db, quiz, old) == {}
+    assert set(stats_by_question(db, quiz)) == {0, 1}
+
+    clear_question_stats(db, quiz.id)
+    db.commit()
+    assert stats_by_question(db, quiz) == {}
+
+def test_quiz_analytics_endpoint(admin, db, quiz):
+    record_game(db, quiz, FIRST_GAME)
+    record_game(db, quiz, FIRST_GAME, revision=quiz.revision - 1)  # other questions: not reported
+
+    response = admin.get(f"/api/analytics/quizzes/{quiz.id}")
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["revision"] == quiz.revision
+    assert report["games"] == 1
+    first = report["questions"][0]
+    assert first["text"] == "Soru 1"
+    assert first["options"] == ["Doğru", "Yanlış 1", "Yanlış 2", "Yanlış 3"]
+    assert (first["attempts"], first["difficulty"], first["discrimination"]) == (4, 0.5, 1.0)
+
+def test_student_trend_endpoint(admin, db, quiz):
+    nickname = f"Öğrenci-{uuid.uuid4().hex[:6]}"
+    record_game(db, quiz, {nickname: [(0, 1.0), (1, 1.0)], "Diğer": [(0, 1.0), (0, 1.0)]})
+    record_game(db, quiz, {nickname: [(0, 1.0), (0, 1.0)], "Diğer": [(1, 1.0), (1, 1.0)]})
+
+    sessions = admin.get("/api/analytics/students", params={"nickname": nickname}).json()["sessions"]
+    assert [(s["quiz_title"], s["score"], s["rank"], s["answers"], s["accuracy"]) for s in sessions] == [
+        ("Analiz Yarışması", 1000, 2, 2, 0.5),
+        ("Analiz Yarışması", 2000, 1, 2, 1.0),
+    ]
+
+    # Results outlive the quiz: the trend keeps the recorded title
+    db.delete(quiz)
+    db.commit()
+    sessions = admin.get("/api/analytics/students", params={"nickname": nickname}).json()["sessions"]
+    assert [(s["quiz_title"], s["score"]) for s in sessions] == [("Analiz Yarışması", 1000), ("Analiz Yarışması", 2000)]
@@ -0,0 +1,136 @@
+import asyncio
+import re
+import secrets
+import time
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from app.core.csrf import CSRF_COOKIE, CSRFMiddleware
+
+def csrf_cookies(response) -> list:
+    return [h for h in response.headers.get_list("set-cookie") if h.startswith(CSRF_COOKIE + "=")]
+
+def test_cookie_issued_on_first_get(client):
+    client.cookies.clear()
+    response = client.get("/login")
+    assert response.status_code == 200
+    (cookie,) = csrf_cookies(response)
+    assert re.match(CSRF_COOKIE + r"=[0-9a-f]{64}; Path=/; SameSite=lax", cookie)
+    client.cookies.clear()
+
+def test_no_cookie_when_already_present(client):
+    client.cookies.set(CSRF_COOKIE, "existing")
+    response = client.get("/login")
+    assert response.status_code == 200
+    assert csrf_cookies(response) == []
+    client.cookies.clear()
+
+def test_cookie_matches_token_rendered_in_form(client):
+    """A non-GET page that renders csrf_token(request) gets the same token as its cookie."""
+    client.cookies.clear()
+    response = client.post("/login", data={"username": "nobody", "password": "wrong"})
+    assert response.status_code == 200
+    rendered = re.search(r'name="csrf_token" value="([0-9a-f]+)"', response.text).group(1)
+    (cookie,) = csrf_cookies(response)
+    assert cookie.startswith(f"{CSRF_COOKIE}={rendered};")
+    client.cookies.clear()
+
+def test_no_cookie_on_post_without_rendered_token(client):
+    client.cookies.clear()
+    response = client.post("/api/ai/preview", json={})
+    assert response.status_code == 401
+    assert csrf_cookies(response) == []
+
+def run_middleware(scope: dict, messages: list) -> tuple:
+    """Runs CSRFMiddleware around an app that sends `messages`.
+
+    Returns (messages that reached the server, send callable the app got, the server's send).
+    """
+    sent = []
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["send"] = send
+        for message in messages:
+            await send(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CSRFMiddleware(app)(scope, receive, send))
+    return sent, seen["send"], send
+
+def test_websocket_scope_untouched():
+    messages = [{"type": "websocket.accept"}, {"type": "websocket.send", "text": "{}"}]
+    sent, app_send, send = run_middleware({"type": "websocket", "path": "/ws/host/1", "headers": []}, messages)
+    assert app_send is send  # no wrapper at all
+    assert sent == messages
+
+def test_streaming_body_passes_through():
+    scope = {"type": "http", "method": "GET", "path": "/api/import/template", "headers": []}
+    chunks = [
+        {"type": "http.response.body", "body": b"part1", "more_body": True},
+        {"type": "http.response.body", "body": b"part2", "more_body": False},
+    ]
+    start = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/octet-stream")]}
+    sent, _, _ = run_middleware(scope, [start] + chunks)
+    assert any(name == b"set-cookie" and value.startswith(b"csrf_token=") for name, value in sent[0]["headers"])
+    assert sent[1:] == chunks
+
+class BaseHTTPCSRFMiddleware(BaseHTTPMiddleware):
+    """The cookie setter as it was before: a BaseHTTPMiddleware (benchmark baseline only)."""
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if CSRF_COOKIE not in request.cookies and request.method == "GET":
+            response.set_cookie(CSRF_COOKIE, secrets.token_hex(32), samesite="lax")
+        return response
+
+async def plain_endpoint(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+def requests_per_second(app, count: int) -> float:
+    """GETs without a CSRF cookie (the cookie is set every time), straight through ASGI."""
+    statuses = []
+
+    def receive_once():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # connection stays open until the response is done
+
+        return receive
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def run():
+        started = time.perf_counter()
+        for _ in range(count):
+            scope = {"type": "http", "method": "GET", "path": "/", "raw_path": b"/", "root_path": "",
+                     "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+                     "server": ("testserver", 80), "client": ("127.0.0.1", 50000)}
+            await app(scope, receive_once(), send)
+        return count / (time.perf_counter() - started)
+
+    rps = asyncio.run(run())
+    assert statuses == [200] * count
+    return rps
+
+def test_middleware_throughput():
+    apps = {
+        "bare": plain_endpoint,
+        "CSRFMiddleware": CSRFMiddleware(plain_endpoint),
+        "BaseHTTPMiddleware": BaseHTTPCSRFMiddleware(plain_endpoint),
+    }
+    for app in apps.values():
+        requests_per_second(app, 200)  # warm-up
+    rps = {name: requests_per_second(app, 2000) for name, app in apps.items()}
+    print(" | ".join(f"{name}: {value:.0f} req/s" for name, value in rps.items()))
+    assert rps["CSRFMiddleware"] > rps["BaseHTTPMiddleware"]
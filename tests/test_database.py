@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app import models
+from app.database import SQLITE_BUSY_TIMEOUT_MS, SessionLocal, engine
+
+def test_sqlite_pragmas(client):
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == SQLITE_BUSY_TIMEOUT_MS
+
+def test_mixed_reads_and_writes(client, quiz_id):
+    """Quiz saves and game reads at the same time: readers never fail with 'database is locked'."""
+    def write(i):
+        db = SessionLocal()
+        try:
+            db.query(models.Quiz).filter(models.Quiz.id == quiz_id).update({"title": f"Başlık {i}"})
+            db.commit()
+        finally:
+            db.close()
+
+    def read(_):
+        db = SessionLocal()
+        try:
+            return db.query(models.Question).filter(models.Question.quiz_id == quiz_id).count()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        writes = [pool.submit(write, i) for i in range(50)]
+        reads = [pool.submit(read, i) for i in range(200)]
+        for future in writes:
+            future.result()
+        assert all(future.result() == 2 for future in reads)
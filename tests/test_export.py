@@ -0,0 +1,26 @@
+import io
+import openpyxl
+from app.core.excel import EXPORT_HEADERS, GROUP_HEADER, XLSX_MEDIA_TYPE
+
+def test_xlsx_export_round_trip(admin, quiz_id):
+    response = admin.get(f"/api/export/{quiz_id}?format=xlsx")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == XLSX_MEDIA_TYPE
+
+    ws = openpyxl.load_workbook(io.BytesIO(response.content), read_only=True).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert list(rows[0]) == EXPORT_HEADERS
+    assert [row[0] for row in rows[1:]] == ["Soru 1", "Soru 2"]
+    assert rows[1][7] == "A"  # "Doğru" is the first option
+
+    # The exported file is a valid import template
+    parsed = admin.post("/api/import/parse", files={"file": ("export.xlsx", response.content, XLSX_MEDIA_TYPE)})
+    assert parsed.status_code == 200, parsed.text
+    assert [q["text"] for q in parsed.json()] == ["Soru 1", "Soru 2"]
+
+def test_xlsx_export_all_groups_by_quiz(admin, quiz_id):
+    response = admin.get("/api/export?format=xlsx")
+    assert response.status_code == 200, response.text
+    rows = list(openpyxl.load_workbook(io.BytesIO(response.content), read_only=True).active.iter_rows(values_only=True))
+    assert rows[0][-1] == GROUP_HEADER
+    assert all(row[-1] for row in rows[1:])
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+import time
+from conftest import sample_quiz, start_game
+
+def test_answer_round_trip(client, quiz_id):
+    with ExitStack() as stack:
+        host, pin, (ali, ayse) = start_game(client, stack, quiz_id, ["Ali", "Ayse"])
+        host.send_json({"type": "START_GAME"})
+        question = host.receive_json()
+        assert question["type"] == "NEW_QUESTION"
+        assert question["index"] == 0
+        for player in (ali, ayse):
+            assert player.receive_json()["type"] == "NEW_QUESTION"
+
+        options = question["question"]["options"]
+        correct = next(i for i, o in enumerate(options) if o["is_correct"])
+        full_time = question["question"]["time"]
+
+        ali.send_json({"type": "SUBMIT_ANSWER", "answer": correct, "time_left": full_time})
+        feedback = ali.receive_json()
+        assert feedback["type"] == "FEEDBACK"
+        assert feedback["result"] == "CORRECT"
+        assert feedback["points_added"] == 1000  # answered with the full time left
+        assert feedback["score"] == 1000
+        assert host.receive_json() == {"type": "ANSWER_UPDATE", "count": 1, "total": 2}
+
+        # Out-of-range index: scored as wrong, never as the last option
+        ayse.send_json({"type": "SUBMIT_ANSWER", "answer": -1, "time_left": full_time})
+        feedback = ayse.receive_json()
+        assert feedback["result"] == "WRONG"
+        assert feedback["points_added"] == 0
+        assert host.receive_json() == {"type": "ANSWER_UPDATE", "count": 2, "total": 2}
+
+        # Everyone answered: the leaderboard follows immediately
+        leaderboard = host.receive_json()
+        assert leaderboard["type"] == "LEADERBOARD"
+        assert [p["nickname"] for p in leaderboard["data"]] == ["Ali", "Ayse"]
+
+def test_broadcast_latency_during_quiz_saves(client, admin, quiz_id):
+    """Question fan-out must not wait for teachers saving quizzes (DB work runs off the event loop)."""
+    payload = sample_quiz("Büyük Yarışma", questions=100)
+
+    def save(_):
+        response = admin.put(f"/api/quizzes/{quiz_id}", json=payload)
+        assert response.status_code == 200, response.text
+
+    with ExitStack() as stack:
+        host, pin, players = start_game(client, stack, quiz_id, ["Oyuncu1", "Oyuncu2", "Oyuncu3"])
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            saves = pool.map(save, range(8))
+            started = time.perf_counter()
+            host.send_json({"type": "START_GAME"})
+            assert host.receive_json()["type"] == "NEW_QUESTION"
+            for player in players:
+                assert player.receive_json()["type"] == "NEW_QUESTION"
+            latency = time.perf_counter() - started
+            list(saves)
+        print(f"broadcast latency during saves: {latency * 1000:.1f} ms")
+        assert latency < 1.0
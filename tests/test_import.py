@@ -0,0 +1,142 @@
+import os
+import subprocess
+import sys
+import openpyxl
+import pytest
+from app.core.excel import (
+    GROUP_HEADER, IMAGE_HEADER, QUESTION_TYPE_HEADER, TEMPLATE_HEADERS, XLSX_MEDIA_TYPE, ExcelFormatError, parse_questions_file
+)
+from app.routers import import_quiz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_xlsx(path, sheets: dict) -> str:
+    """Writes {sheet title: rows} (header row included) to an .xlsx file."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for title, rows in sheets.items():
+        ws = wb.create_sheet(title=title)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+    return str(path)
+
+def question_rows(count: int, prefix: str = "Soru") -> list:
+    return [[f"{prefix} {i + 1}", 20, 1000, "A1", "B1", "C1", "D1", "B"] for i in range(count)]
+
+def upload(client, url: str, path: str, name: str = "sorular.xlsx"):
+    with open(path, "rb") as f:
+        return client.post(url, files={"file": (name, f, XLSX_MEDIA_TYPE)})
+
+def test_parse_returns_questions(admin, tmp_path):
+    header = TEMPLATE_HEADERS + [QUESTION_TYPE_HEADER, IMAGE_HEADER]
+    rows = [
+        ["Başkent?", 30, 2000, "İstanbul", "Ankara", "İzmir", "Bursa", "B", "", ""],
+        ["Doğru mu?", 10, 0, "Doğru", "Yanlış", "", "", "A", "true_false", "/uploads/x.png"],
+    ]
+    path = make_xlsx(tmp_path / "q.xlsx", {"Sorular": [header] + rows})
+    response = upload(admin, "/api/import/parse", path)
+    assert response.status_code == 200, response.text
+    first, second = response.json()
+    assert first["points"] == 2000
+    assert first["options"][1] == {"text": "Ankara", "is_correct": True}
+    assert second["question_type"] == "true_false"
+    assert second["points"] == 0
+    assert second["image_url"] == "/uploads/x.png"
+    assert len(second["options"]) == 2
+
+def test_upload_creates_quiz(admin, tmp_path):
+    path = make_xlsx(tmp_path / "q.xlsx", {"Sorular": [TEMPLATE_HEADERS] + question_rows(3)})
+    response = upload(admin, "/api/import/upload", path)
+    assert response.status_code == 200, response.text
+    assert response.json()["questions_count"] == 3
+    quiz = admin.get(f"/api/quizzes/{response.json()['quiz_id']}").json()
+    assert [q["text"] for q in quiz["questions"]] == ["Soru 1", "Soru 2", "Soru 3"]
+
+def test_row_limit(admin, tmp_path, monkeypatch):
+    monkeypatch.setattr(import_quiz, "MAX_IMPORT_ROWS", 5)
+    path = make_xlsx(tmp_path / "q.xlsx", {"Sorular": [TEMPLATE_HEADERS] + question_rows(6)})
+    response = upload(admin, "/api/import/parse", path)
+    assert response.status_code == 400
+    assert "5" in response.json()["detail"]
+
+def test_invalid_cell_is_a_client_error(admin, tmp_path):
+    rows = question_rows(2)
+    rows[1][1] = "yirmi"  # text in the time column
+    path = make_xlsx(tmp_path / "q.xlsx", {"Sorular": [TEMPLATE_HEADERS] + rows})
+    response = upload(admin, "/api/import/upload", path)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Satır 3:")
+
+def test_rejects_other_files(admin, tmp_path):
+    path = tmp_path / "q.csv"
+    path.write_text("Soru Metni\n")
+    response = upload(admin, "/api/import/parse", str(path), name="q.csv")
+    assert response.status_code == 400
+
+def test_large_sheet_streams(tmp_path):
+    """10k rows parse in read-only mode, and the row cap stops the reader mid-sheet."""
+    path = make_xlsx(tmp_path / "big.xlsx", {"Sorular": [TEMPLATE_HEADERS] + question_rows(10000)})
+    assert len(parse_questions_file(path, True, 10000)) == 10000
+
+    with pytest.raises(ExcelFormatError) as exc:
+        parse_questions_file(path, True, 9999)
+    assert exc.value.status_code == 400
+
+def test_bulk_import_one_quiz_per_sheet(admin, tmp_path):
+    bad_rows = question_rows(2, "Coğrafya")
+    bad_rows[1][7] = "E"  # not a valid answer letter
+    path = make_xlsx(tmp_path / "bank.xlsx", {
+        "Tarih": [TEMPLATE_HEADERS] + question_rows(3, "Tarih"),
+        "Coğrafya": [TEMPLATE_HEADERS] + bad_rows,
+        "Notlar": [["Bu sayfa soru içermiyor"]],
+    })
+    response = upload(admin, "/api/import/bulk", path)
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert [(q["title"], q["questions_count"]) for q in result["created"]] == [("Tarih", 3)]
+    assert result["skipped"] == [{"title": "Coğrafya", "error_count": 1}]
+    assert {(e["sheet"], e["row"]) for e in result["errors"]} == {("Notlar", 1), ("Coğrafya", 3)}
+    assert result["rows"] == 5
+    assert result["rows_per_second"] is None or result["rows_per_second"] > 0
+
+def test_bulk_import_groups_by_column(admin, tmp_path):
+    header = TEMPLATE_HEADERS + [GROUP_HEADER]
+    rows = [row + [quiz] for row, quiz in zip(question_rows(4), ["Birinci", "İkinci", "Birinci", "İkinci"])]
+    path = make_xlsx(tmp_path / "bank.xlsx", {"Banka": [header] + rows})
+    response = upload(admin, "/api/import/bulk", path)
+    assert response.status_code == 200, response.text
+    created = {q["title"]: q for q in response.json()["created"]}
+    assert set(created) == {"Birinci", "İkinci"}
+
+    quiz = admin.get(f"/api/quizzes/{created['Birinci']['quiz_id']}").json()
+    assert [q["text"] for q in quiz["questions"]] == ["Soru 1", "Soru 3"]
+
+IMPORT_BENCHMARK = """
+import resource, sys, time
+import openpyxl
+from app.core.excel import parse_questions_file, parse_row
+started = time.perf_counter()
+if sys.argv[2] == "streaming":
+    questions = parse_questions_file(sys.argv[1], True, 10000)
+else:  # the old importer: full workbook object graph, then the rows
+    ws = openpyxl.load_workbook(sys.argv[1]).active
+    questions = [parse_row(row, True) for row in ws.iter_rows(min_row=2, values_only=True)]
+assert len(questions) == 10000
+print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def test_large_sheet_benchmark(tmp_path):
+    """Wall time and peak RSS of a 10k-row import, streaming vs full workbook load (fresh process each)."""
+    pytest.importorskip("resource")  # ru_maxrss: Unix only
+    path = make_xlsx(tmp_path / "big.xlsx", {"Sorular": [TEMPLATE_HEADERS] + question_rows(10000)})
+    results = {}
+    for mode in ("full", "streaming"):
+        result = subprocess.run([sys.executable, "-c", IMPORT_BENCHMARK, path, mode],
+                                cwd=ROOT, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        seconds, max_rss_kb = result.stdout.split()
+        results[mode] = (float(seconds), int(max_rss_kb))
+        print(f"10k-row import ({mode}): {float(seconds) * 1000:.0f} ms, peak RSS {int(max_rss_kb) / 1024:.1f} MB")
+    assert results["streaming"][1] < results["full"][1]
@@ -0,0 +1,106 @@
+import statistics
+import time
+import migrate_quiz_documents
+from app import models, quiz_store
+from app.database import SessionLocal
+from app.routers.game import load_quiz_data
+from conftest import sample_quiz
+
+def load_quiz(quiz_id: int):
+    db = SessionLocal()
+    try:
+        quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+        return quiz, quiz_store.build_document(quiz)["questions"]
+    finally:
+        db.close()
+
+def test_document_mode_mirrors_tables(admin, quiz_id, monkeypatch):
+    monkeypatch.setattr(quiz_store, "QUIZ_STORAGE_MODE", "document")
+    response = admin.put(f"/api/quizzes/{quiz_id}", json=sample_quiz("Belge", questions=3))
+    assert response.status_code == 200, response.text
+
+    quiz, from_tables = load_quiz(quiz_id)
+    assert quiz_store.has_document(quiz)
+    assert quiz.document["questions"] == from_tables
+
+    data = admin.get(f"/api/quizzes/{quiz_id}").json()
+    assert [q["text"] for q in data["questions"]] == ["Soru 1", "Soru 2", "Soru 3"]
+    assert data["revision"] == quiz.revision
+
+def test_document_mode_duplicate(admin, quiz_id, monkeypatch):
+    monkeypatch.setattr(quiz_store, "QUIZ_STORAGE_MODE", "document")
+    admin.put(f"/api/quizzes/{quiz_id}", json=sample_quiz("Kaynak"))
+    response = admin.post(f"/api/quizzes/duplicate/{quiz_id}", follow_redirects=False)
+    assert response.status_code == 303
+
+    db = SessionLocal()
+    try:
+        copy_id = db.query(models.Quiz.id).filter(models.Quiz.title == "Kaynak (Kopya)").order_by(models.Quiz.id.desc()).first()[0]
+    finally:
+        db.close()
+    copy, copy_questions = load_quiz(copy_id)
+    _, original_questions = load_quiz(quiz_id)
+    strip_ids = lambda questions: [
+        {**q, "id": None, "options": [{**o, "id": None} for o in q["options"]]} for q in questions
+    ]
+    assert strip_ids(copy_questions) == strip_ids(original_questions)
+    assert copy.document["questions"] == copy_questions
+
+def test_normalized_mode_drops_document(admin, quiz_id, monkeypatch):
+    monkeypatch.setattr(quiz_store, "QUIZ_STORAGE_MODE", "document")
+    admin.put(f"/api/quizzes/{quiz_id}", json=sample_quiz())
+    monkeypatch.setattr(quiz_store, "QUIZ_STORAGE_MODE", "normalized")
+    before, _ = load_quiz(quiz_id)
+    admin.put(f"/api/quizzes/{quiz_id}", json=sample_quiz())
+
+    after, _ = load_quiz(quiz_id)
+    assert after.document is None  # no stale copy for when documents are switched back on
+    assert after.revision == before.revision + 1
+
+def test_migration_both_directions(admin, quiz_id):
+    _, original = load_quiz(quiz_id)
+
+    migrate_quiz_documents.to_documents()
+    quiz, _ = load_quiz(quiz_id)
+    assert quiz.document["questions"] == original
+
+    migrate_quiz_documents.to_normalized()
+    quiz, rebuilt = load_quiz(quiz_id)
+    assert quiz.document is None
+    assert rebuilt == original  # same rows, same ids
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of `repeat` calls, in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def test_storage_mode_benchmark(admin, quiz_id, monkeypatch):
+    """Read/write timings of a 50-question quiz, document vs normalized storage."""
+    payload = sample_quiz("Kıyas", questions=50)
+    results = {}
+    for mode in ("normalized", "document"):
+        monkeypatch.setattr(quiz_store, "QUIZ_STORAGE_MODE", mode)
+
+        def save():
+            assert admin.put(f"/api/quizzes/{quiz_id}", json=payload).status_code == 200
+
+        def duplicate():
+            assert admin.post(f"/api/quizzes/duplicate/{quiz_id}", follow_redirects=False).status_code == 303
+
+        results[mode] = {
+            "write": timed(save, 5),
+            "read": timed(lambda: load_quiz_data(quiz_id), 20),  # what hosting a game loads
+            "duplicate": timed(duplicate, 5),
+        }
+        assert len(load_quiz_data(quiz_id)["questions"]) == 50
+
+    for op in ("write", "read", "duplicate"):
+        print(f"{op:>9}: normalized {results['normalized'][op] * 1000:7.1f} ms | "
+              f"document {results['document'][op] * 1000:7.1f} ms")
+    # Single-row reads and inserts instead of 50 questions x 4 options
+    assert results["document"]["read"] < results["normalized"]["read"]
+    assert results["document"]["duplicate"] < results["normalized"]["duplicate"]
@@ -0,0 +1,118 @@
+from contextlib import ExitStack
+import asyncio
+import time
+from app import models
+from app.database import SessionLocal
+from app.results_writer import ResultsWriter, results_writer
+from conftest import play_game, receive_until, start_game, wait_for_game
+
+def run_writer(writer: ResultsWriter, events: list, write):
+    """Queues `events` before the consumer gets to run, then drains; `write` stands in for _write."""
+    writer._write = write
+
+    async def scenario():
+        writer.start()
+        for kind, payload in events:
+            writer.submit(kind, payload)
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+def answer_events(count: int, marker: str = "ok") -> list:
+    return [("answers", {"uid": marker, "answers": [{}]})] * count
+
+def test_events_are_batched():
+    sizes = []
+
+    def write(batch):
+        sizes.append(len(batch))
+        return len(batch)
+
+    writer = ResultsWriter(enabled=True, batch_size=3)
+    run_writer(writer, answer_events(7), write)
+    assert sizes == [3, 3, 1]
+    stats = writer.stats()
+    assert stats["batches_written"] == 3
+    assert stats["events_written"] == 7
+    assert stats["answers_written"] == 7
+
+def test_failed_batch_is_retried():
+    attempts = []
+
+    def write(batch):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return len(batch)
+
+    writer = ResultsWriter(enabled=True, batch_size=10, retries=2, retry_delay=0)
+    run_writer(writer, answer_events(4), write)
+    assert attempts == [4, 4]
+    stats = writer.stats()
+    assert stats["retried_batches"] == 1
+    assert stats["failed_batches"] == 0
+    assert stats["answers_written"] == 4  # counted once, after the commit
+
+def test_batch_dropped_after_last_retry():
+    attempts = []
+
+    def write(batch):
+        attempts.append(batch[0][1]["uid"])
+        if batch[0][1]["uid"] == "bad":
+            raise RuntimeError("constraint failed")
+        return len(batch)
+
+    writer = ResultsWriter(enabled=True, batch_size=2, retries=2, retry_delay=0)
+    run_writer(writer, answer_events(2, "bad") + answer_events(1), write)
+    assert attempts == ["bad", "bad", "bad", "ok"]  # later batches keep flowing
+    stats = writer.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["dropped_events"] == 2
+    assert stats["batches_written"] == 1
+
+def test_game_results_persisted(client, quiz_id):
+    pin = play_game(client, quiz_id, {"Ali": ["Doğru", "Yanlış 1"], "Veli": ["Yanlış 2", None]})
+    game = wait_for_game(pin)
+    assert game.finished
+    assert game.quiz_id == quiz_id
+    assert game.question_count == 2
+
+    db = SessionLocal()
+    try:
+        answers = (db.query(models.GameAnswer).filter(models.GameAnswer.game_id == game.id)
+                   .order_by(models.GameAnswer.question_index, models.GameAnswer.nickname).all())
+        assert [(a.question_index, a.nickname, a.option_index, a.is_correct, a.points) for a in answers] == [
+            (0, "Ali", 0, True, 1000),
+            (0, "Veli", 2, False, 0),
+            (1, "Ali", 1, False, 0),
+        ]
+        players = (db.query(models.GamePlayerResult).filter(models.GamePlayerResult.game_id == game.id)
+                   .order_by(models.GamePlayerResult.rank).all())
+        assert [(p.nickname, p.score, p.rank) for p in players] == [("Ali", 1000, 1), ("Veli", 0, 2)]
+    finally:
+        db.close()
+
+def test_answer_latency_with_slow_persistence(client, quiz_id, monkeypatch):
+    """Answers are acknowledged from memory: a slow results database must not delay FEEDBACK."""
+    write = results_writer._write
+
+    def slow_write(batch):
+        time.sleep(0.5)
+        return write(batch)
+
+    monkeypatch.setattr(results_writer, "_write", slow_write)
+    with ExitStack() as stack:
+        host, pin, players = start_game(client, stack, quiz_id, ["Oyuncu1", "Oyuncu2", "Oyuncu3"])
+        host.send_json({"type": "START_GAME"})  # queues game_started: the writer is now busy
+        question = receive_until(host, "NEW_QUESTION")["question"]
+        correct = next(i for i, o in enumerate(question["options"]) if o["is_correct"])
+
+        latencies = []
+        for player in players:
+            receive_until(player, "NEW_QUESTION")
+            started = time.perf_counter()
+            player.send_json({"type": "SUBMIT_ANSWER", "answer": correct, "time_left": question["time"]})
+            assert receive_until(player, "FEEDBACK")["result"] == "CORRECT"
+            latencies.append(time.perf_counter() - started)
+        print(f"answer latency with slow persistence: max {max(latencies) * 1000:.1f} ms")
+        assert max(latencies) < 0.25
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded on first use of AI generation / Excel import, never at startup
+LAZY_MODULES = ("openpyxl", "google.generativeai")
+
+def test_import_is_lazy(tmp_path):
+    """`import main` under -X importtime: no heavy optional deps, no schema setup."""
+    db_path = tmp_path / "fresh.db"
+    env = dict(os.environ, SQLITE_DATABASE_URL=f"sqlite:///{db_path}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+    for module in LAZY_MODULES:
+        assert module not in imported, f"{module} is imported at startup"
+    assert not db_path.exists(), "database touched at import time"
+
+    total_us = max(int(line.split("|")[1]) for line in result.stderr.splitlines()
+                   if line.startswith("import time:") and line.split("|")[1].strip().isdigit())
+    print(f"import main: {total_us / 1000:.0f} ms")
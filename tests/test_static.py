@@ -0,0 +1,42 @@
+import os
+import pytest
+from app.core.static import IMMUTABLE_CACHE, CachedStaticFiles
+
+@pytest.fixture
+def static_root(tmp_path):
+    """style.css with precompressed siblings (contents don't matter: only the chosen file is checked)."""
+    for name in ("style.css", "style.css.gz", "style.css.br", "app.0123456789ab.js"):
+        (tmp_path / name).write_bytes(b"body{}")
+    return tmp_path
+
+def serve(root, name: str, accept_encoding: str = None):
+    path = str(root / name)
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {"type": "http", "method": "GET", "path": "/static/" + name, "headers": headers}
+    return CachedStaticFiles(directory=str(root)).file_response(path, os.stat(path), scope)
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("gzip, br;q=0", "gzip"),  # "br" is in the header, but ruled out
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_precompressed_negotiation(static_root, accept_encoding, expected):
+    response = serve(static_root, "style.css", accept_encoding)
+    assert response.headers.get("content-encoding") == expected
+    suffix = {"br": ".br", "gzip": ".gz", None: ""}[expected]
+    assert response.path == str(static_root / "style.css") + suffix
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_stale_sibling_is_skipped(static_root):
+    css = static_root / "style.css"
+    stat = os.stat(css)
+    os.utime(static_root / "style.css.br", (stat.st_atime, stat.st_mtime - 60))  # built before the last edit
+    assert serve(static_root, "style.css", "br, gzip").headers["content-encoding"] == "gzip"
+
+def test_cache_control(static_root):
+    assert serve(static_root, "app.0123456789ab.js").headers["cache-control"] == IMMUTABLE_CACHE
+    assert serve(static_root, "style.css").headers["cache-control"] == "no-cache"